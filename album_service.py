@@ -1,10 +1,33 @@
+import hashlib
+import io
+import os
 import re
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from mutagen.id3 import ID3, TIT2, TRCK, TALB, TPE1, ID3NoHeaderError
-
+import formats
+import tracing
 from models import AlbumProject
+from export_manifest import MANIFEST_NAME, Manifest
+from file_copy import BUFFERED, CopyCancelled, clone_or_copy, copy_range, read_at, write_at
+from mp3_header import id3v2_tag_size, pad_id3v2_tag
+
+if TYPE_CHECKING:
+    from mutagen.id3 import ID3
+
+DEFAULT_EXPORT_WORKERS = 2
+TAG_PADDING = 1024  # room for later in-place tag edits
+# "stream": write the new tag and the source audio in one pass.
+# "copy": copy the whole file, then let mutagen rewrite the tag in place.
+# Formats that can't be streamed (see formats.FormatProvider) are always copied.
+EXPORT_MODES = ("stream", "copy")
+
+
+class ExportCancelled(Exception):
+    pass
 
 
 def sanitize_filename(name: str) -> str:
@@ -13,8 +36,14 @@ def sanitize_filename(name: str) -> str:
     return name or "Untitled"
 
 
-def export_album(project: AlbumProject, output_dir: Path) -> list[str]:
-    """Copy, rename, and tag tracks. Returns list of created paths."""
+def plan_export(project: AlbumProject, output_dir: Path,
+                providers: list[formats.FormatProvider] | None = None
+                ) -> tuple[Path, list[Path]]:
+    """Validate the project and return the album folder and target paths.
+
+    Each target keeps its source's format; ``providers`` (one per track)
+    saves detecting them again.
+    """
     if not project.tracks:
         raise ValueError("No tracks to export")
     if not project.album_name.strip():
@@ -30,27 +59,366 @@ def export_album(project: AlbumProject, output_dir: Path) -> list[str]:
             )
         seen[t] = i
 
+    if providers is None:
+        providers = [formats.provider_for(t.source_path) for t in project.tracks]
     album_dir = output_dir / sanitize_filename(project.album_name)
-    album_dir.mkdir(parents=True, exist_ok=True)
+    dests = [album_dir / f"{i:02d}. {t}{p.extensions[0]}"
+             for i, (t, p) in enumerate(zip(titles, providers), 1)]
+    return album_dir, dests
+
+
+def _load_tags(path) -> "ID3":
+    """The file's ID3 tag, or an empty one (mutagen is imported on first use)."""
+    from mutagen.id3 import ID3, ID3NoHeaderError
+
+    try:
+        return ID3(path)
+    except ID3NoHeaderError:
+        return ID3()
+
+
+def audio_span(path: str) -> tuple[int, int, bool]:
+    """(start, end, has_id3v1) of the audio between the ID3v2 and ID3v1 tags."""
+    with open(path, "rb") as f:
+        start = 0
+        while True:
+            f.seek(start)
+            size = id3v2_tag_size(f.read(10))
+            if not size:
+                break
+            start += size
+        end = os.fstat(f.fileno()).st_size
+        has_v1 = False
+        if end - start >= 128:
+            f.seek(end - 128)
+            has_v1 = f.read(3) == b"TAG"
+            if has_v1:
+                end -= 128
+    return start, max(start, end), has_v1
+
+
+def render_tags(source_path: str, number: int, album_name: str, band_name: str,
+                title: str, with_v1: bool = False) -> tuple[bytes, bytes]:
+    """Build the exported ID3v2 tag (and optional ID3v1 tag) in memory.
+
+    Frames already in the source tag are kept; only the album frames change.
+    """
+    tags = _load_tags(source_path)
+    formats.set_id3_album_frames(tags, number, album_name, band_name, title)
+    buf = io.BytesIO()
+    tags.save(buf, v1=2 if with_v1 else 0, padding=lambda info: 0)
+    data = buf.getvalue()
+    v2_len = id3v2_tag_size(data[:10])
+    return data[:v2_len], data[v2_len:]
+
+
+class ExportJob:
+    """Copies and tags an album on a bounded worker pool.
+
+    Files are written under a temporary name and renamed when complete.
+    With ``incremental`` (the default) a manifest in the album folder
+    records every finished file, so a later run only renames, re-tags or
+    copies what changed, and an interrupted run resumes where it stopped;
+    cancelling then removes only unfinished files. Without it, cancelling
+    or any failure removes everything this job wrote.
+    ``on_file_progress(index, bytes_done, bytes_total)`` and
+    ``on_progress(files_done, bytes_done, bytes_total)`` are called from
+    worker threads; the same numbers are available as attributes for UIs
+    that poll.
+    """
+
+    def __init__(self, project: AlbumProject, output_dir: Path,
+                 max_workers: int = DEFAULT_EXPORT_WORKERS,
+                 on_file_progress=None, on_progress=None, mode: str = "stream",
+                 incremental: bool = True):
+        if mode not in EXPORT_MODES:
+            raise ValueError(f"Unknown export mode: {mode}")
+        self.mode = mode
+        self.incremental = incremental
+        self.album_name = project.album_name
+        self.band_name = project.band_name
+        self.tracks = list(project.tracks)
+        self.providers = [formats.provider_for(t.source_path) for t in self.tracks]
+        self.album_dir, self.dests = plan_export(project, Path(output_dir), self.providers)
+        self.max_workers = max(1, max_workers)
+        self.on_file_progress = on_file_progress
+        self.on_progress = on_progress
+        self.files_total = len(self.tracks)
+        self.files_done = 0
+        self.bytes_total = 0  # known once the export has been planned
+        self.bytes_done = 0
+        self.created: list[str] = []
+        self.strategies: dict[int, str] = {}  # what was done per track index
+        self._manifest: Manifest | None = None
+        self.error: Exception | None = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self) -> list[str]:
+        """Block until finished; returns created paths or raises the failure."""
+        self._thread.join()
+        if self.error:
+            raise self.error
+        return self.created
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def _wanted_tags(self, index: int) -> dict:
+        tags = {"TRCK": str(index + 1), "TALB": self.album_name,
+                "TIT2": self.tracks[index].title}
+        if self.band_name.strip():
+            tags["TPE1"] = self.band_name
+        return tags
 
-    created = []
-    for i, track in enumerate(project.tracks, 1):
-        safe_title = sanitize_filename(track.title)
-        dest = album_dir / f"{i:02d}. {safe_title}.mp3"
-        shutil.copy2(track.source_path, dest)
+    @tracing.traced("export_album", "export")
+    def _run(self):
+        made_dir = not self.album_dir.exists()
+        written: list[Path] = []
+        try:
+            self.album_dir.mkdir(parents=True, exist_ok=True)
+            self._remove_leftovers()
+            manifest = Manifest.load(self.album_dir) if self.incremental \
+                else Manifest(self.album_dir)
+            self._manifest = manifest
+            names = [d.name for d in self.dests]
+            reuse, stale = manifest.plan([t.source_path for t in self.tracks], names)
+
+            # Drop files the new running order no longer contains
+            for name in stale:
+                _unlink(self.album_dir / name)
+                del manifest.entries[name]
+            self._apply_renames(reuse, names)
+            manifest.save()
+
+            work = []
+            for i, old in enumerate(reuse):
+                if old is None:
+                    work.append((self._export_one, i))
+                elif manifest.entries[names[i]]["tags"] != self._wanted_tags(i):
+                    work.append((self._retag_one, i))
+                else:
+                    self.strategies.setdefault(i, "unchanged")
+                    self.files_done += 1
+            self.bytes_total = sum(_file_size(self.tracks[i].source_path)
+                                   for fn, i in work if fn == self._export_one)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._traced_file, fn, i, written) for fn, i in work]
+                for fut in as_completed(futures):
+                    try:
+                        fut.result()
+                    except Exception as e:
+                        if self.error is None and not isinstance(e, ExportCancelled):
+                            self.error = e
+                        self._cancel.set()
+            if self._cancel.is_set() and self.error is None:
+                self.error = ExportCancelled("Export cancelled")
+            if self.error is None:
+                self.created = [str(d) for d in self.dests]
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.error is not None:
+                self._cleanup(written, made_dir)
+            self._done.set()
+
+    def _traced_file(self, fn, index: int, written: list[Path]):
+        if not tracing.enabled:
+            return fn(index, written)
+        with tracing.span("export file", "export", file=self.dests[index].name,
+                          step=fn.__name__.strip("_")):
+            return fn(index, written)
+
+    def _remove_leftovers(self):
+        """Delete temporary files left behind by an interrupted export."""
+        for path in self.album_dir.iterdir():
+            if path.name.endswith((".part", ".moving")) or path.name == MANIFEST_NAME + ".tmp":
+                _unlink(path)
+
+    def _apply_renames(self, reuse: list[str | None], names: list[str]):
+        """Move reused files to their new names, via temporary names so that
+        swapped positions never collide."""
+        moves = [(i, old) for i, old in enumerate(reuse) if old and old != names[i]]
+        entries = self._manifest.entries
+        moved = {}
+        for i, old in moves:
+            tmp = f".{i:04d}.moving"
+            os.replace(self.album_dir / old, self.album_dir / tmp)
+            moved[i] = (tmp, entries.pop(old))
+        for i, (tmp, entry) in moved.items():
+            os.replace(self.album_dir / tmp, self.dests[i])
+            entries[names[i]] = entry
+            self.strategies[i] = "rename"
 
-        # Update ID3 tags
+    def _record(self, index: int, entry: dict):
+        with self._lock:
+            self._manifest.entries[self.dests[index].name] = entry
+            self._manifest.save()
+            self.files_done += 1
+        if self.on_progress:
+            self.on_progress(self.files_done, self.bytes_done, self.bytes_total)
+
+    def _retag_one(self, index: int, written: list[Path]):
+        """Rewrite only the tag of an already exported file, if it still fits."""
+        if self._cancel.is_set():
+            raise ExportCancelled
+        track, dest = self.tracks[index], self.dests[index]
+        provider = self.providers[index]
+        if not provider.streamable:
+            provider.write_tags(dest, index + 1, self.album_name, self.band_name, track.title)
+            self._finish_retag(index, dest)
+            return
+        start, _, has_v1 = audio_span(str(dest))
+        v2_tag, v1_tag = render_tags(track.source_path, index + 1, self.album_name,
+                                     self.band_name, track.title, with_v1=has_v1)
+        if len(v2_tag) > start:
+            self._export_one(index, written)
+            return
+        with open(dest, "r+b", buffering=0) as out:
+            fd = out.fileno()
+            write_at(fd, pad_id3v2_tag(v2_tag, start), 0)
+            if v1_tag:
+                write_at(fd, v1_tag, os.fstat(fd).st_size - len(v1_tag))
+        self._finish_retag(index, dest)
+
+    def _finish_retag(self, index: int, dest: Path):
+        entry = dict(self._manifest.entries[dest.name], tags=self._wanted_tags(index))
+        self.strategies[index] = "rename+retag" if self.strategies.get(index) == "rename" \
+            else "retag"
+        self._record(index, entry)
+
+    def _export_one(self, index: int, written: list[Path]):
+        if self._cancel.is_set():
+            raise ExportCancelled
+        track, dest = self.tracks[index], self.dests[index]
+        part = dest.with_name(dest.name + ".part")
+        with self._lock:
+            written.append(part)
         try:
-            tags = ID3(dest)
-        except ID3NoHeaderError:
-            tags = ID3()
-        tags.setall("TRCK", [TRCK(encoding=3, text=str(i))])
-        tags.setall("TALB", [TALB(encoding=3, text=project.album_name)])
-        if project.band_name.strip():
-            tags.setall("TPE1", [TPE1(encoding=3, text=project.band_name)])
-        tags.setall("TIT2", [TIT2(encoding=3, text=track.title)])
-        tags.save(dest)
-
-        created.append(str(dest))
-
-    return created
+            if self.mode == "stream" and self.providers[index].streamable:
+                strategy, digest = self._write_streamed(index, track, part)
+            else:
+                strategy, digest = self._write_copied(index, track, part)
+        except CopyCancelled:
+            raise ExportCancelled
+        self.strategies[index] = strategy
+        with self._lock:
+            written.append(dest)
+        os.replace(part, dest)
+        self._record(index, Manifest.make_entry(track.source_path, self._wanted_tags(index),
+                                                digest))
+
+    def _write_streamed(self, index: int, track, part: Path) -> tuple[str, str | None]:
+        """New tag followed by the source audio, written in a single pass.
+
+        Returns the copy strategy and the source's SHA-256 if the copy read
+        every byte through Python anyway (None for kernel-side copies).
+        """
+        start, end, has_v1 = audio_span(track.source_path)
+        v2_tag, v1_tag = render_tags(track.source_path, index + 1, self.album_name,
+                                     self.band_name, track.title, with_v1=has_v1)
+        hasher = hashlib.sha256()
+        with open(track.source_path, "rb") as src, open(part, "wb", buffering=0) as out:
+            src_fd, dst_fd = src.fileno(), out.fileno()
+            size = os.fstat(src_fd).st_size
+            if 0 < len(v2_tag) <= start:
+                # The new tag fits where the old one was: duplicate the file
+                # (a reflink where possible) and patch only the tag regions.
+                strategy = clone_or_copy(src_fd, dst_fd, size, *self._progress(index, size),
+                                         hasher=hasher)
+                write_at(dst_fd, pad_id3v2_tag(v2_tag, start), 0)
+                if v1_tag:
+                    write_at(dst_fd, v1_tag, size - len(v1_tag))
+            else:
+                v2_tag = pad_id3v2_tag(v2_tag, len(v2_tag) + TAG_PADDING)
+                write_at(dst_fd, v2_tag, 0)
+                length = end - start
+                hasher.update(read_at(src_fd, start, 0))  # the old tag, just parsed
+                strategy = copy_range(src_fd, dst_fd, start, length, len(v2_tag),
+                                      *self._progress(index, length), hasher=hasher)
+                write_at(dst_fd, v1_tag, len(v2_tag) + length)
+                if strategy == BUFFERED:
+                    hasher.update(read_at(src_fd, size - end, end))
+        shutil.copymode(track.source_path, part)
+        return strategy, hasher.hexdigest() if strategy == BUFFERED else None
+
+    def _write_copied(self, index: int, track, part: Path) -> tuple[str, str | None]:
+        hasher = hashlib.sha256()
+        with open(track.source_path, "rb") as src, open(part, "wb", buffering=0) as out:
+            size = os.fstat(src.fileno()).st_size
+            strategy = clone_or_copy(src.fileno(), out.fileno(), size,
+                                     *self._progress(index, size), hasher=hasher)
+        shutil.copystat(track.source_path, part)
+        self.providers[index].write_tags(part, index + 1, self.album_name, self.band_name,
+                                         track.title)
+        return strategy, hasher.hexdigest() if strategy == BUFFERED else None
+
+    def _progress(self, index: int, total: int):
+        """(progress, cancelled) callbacks for one file's copy."""
+        copied = 0
+
+        def progress(n):
+            nonlocal copied
+            copied += n
+            self._advance(index, copied, total, n)
+
+        return progress, self._cancel.is_set
+
+    def _advance(self, index: int, copied: int, total: int, delta: int):
+        with self._lock:
+            self.bytes_done += delta
+        if self.on_file_progress:
+            self.on_file_progress(index, copied, total)
+        if self.on_progress:
+            self.on_progress(self.files_done, self.bytes_done, self.bytes_total)
+
+    def _cleanup(self, written: list[Path], made_dir: bool):
+        for path in written:
+            # Finished files stay when the manifest lets the next run resume
+            if self.incremental and not path.name.endswith(".part"):
+                continue
+            _unlink(path)
+        if made_dir and not self.incremental:
+            _unlink(Manifest(self.album_dir).path)
+            try:
+                self.album_dir.rmdir()
+            except OSError:
+                pass
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def export_album(project: AlbumProject, output_dir: Path,
+                 max_workers: int = DEFAULT_EXPORT_WORKERS, mode: str = "stream",
+                 incremental: bool = True) -> list[str]:
+    """Copy, rename, and tag tracks. Returns list of created paths."""
+    job = ExportJob(project, output_dir, max_workers=max_workers, mode=mode,
+                    incremental=incremental)
+    job.start()
+    return job.wait()
@@ -1,26 +1,49 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from collections import Counter
+from tkinter import ttk, filedialog, messagebox, simpledialog
 from pathlib import Path
 
+import tracing
 from theme import COLORS
-from models import AlbumProject
-from track_list import TrackList
-from album_service import export_album
-from project_io import save_project, load_project
+from models import CD_LIMIT_SECS, AlbumProject, Track
+from cd_fit import best_subset, split_discs
+from track_list import DUPLICATE_MODES, TrackList
+from album_service import DEFAULT_EXPORT_WORKERS, ExportCancelled, ExportJob
+from project_io import save_workspace, load_workspace
+from workspace import Workspace
 from audio_player import AudioPlayer
+import loudness
+import mp3_scan
+
+END_LEAD_MS = 300  # wake this early for track ends, then confirm in short steps
+END_RECHECK_MS = 50
 
 
 class App(ttk.Frame):
     def __init__(self, root):
         super().__init__(root)
         self.root = root
-        self.project = AlbumProject()
+        self.workspace = Workspace.single(AlbumProject())
+        self.project = self.workspace.project  # the active version
+        self._histories = {}  # version name -> undo history while not shown
         self.output_dir: str = ""
+        self.export_workers = DEFAULT_EXPORT_WORKERS  # parallel copies to the target
+        self._export_job: ExportJob | None = None
         self.player = AudioPlayer()
+        self.auditioning = False  # playing the running order back to back
+        self._end_after = None
+        self._gap_after = None
+        # Album positions of the playing and queued tracks: the same file can
+        # fill several slots, so a Track alone doesn't say where play is
+        self._play_pos: int | None = None
+        self._queued_pos: int | None = None
         self.pack(fill="both", expand=True)
         self._build_ui()
         self._update_duration()
-        self._poll_playback()
+        self._update_undo_buttons()
+        self.root.bind_all("<Control-z>", self._undo)
+        self.root.bind_all("<Control-y>", self._redo)
+        self.root.bind_all("<Control-Shift-Z>", self._redo)
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     def _build_ui(self):
@@ -42,7 +65,9 @@ class App(ttk.Frame):
         left.columnconfigure(0, weight=1)
 
         self.track_list = TrackList(left, on_change=self._on_tracks_changed,
-                                     on_play_track=self._on_play_track)
+                                     on_play_track=self._on_play_track,
+                                     project=self.project,
+                                     on_field_change=self._set_field)
         self.track_list.grid(row=0, column=0, sticky="nsew")
 
         # Now-playing bar
@@ -52,14 +77,31 @@ class App(ttk.Frame):
         self.np_frame.columnconfigure(0, weight=1)
         self.np_label = ttk.Label(self.np_frame, text="Stopped", style="Playing.TLabel")
         self.np_label.grid(row=0, column=0, sticky="w", padx=8, pady=4)
+        ttk.Label(self.np_frame, text="Gap (s):", style="Playing.TLabel").grid(
+            row=0, column=1, padx=(0, 3))
+        self.gap_var = tk.StringVar(value="2")
+        ttk.Spinbox(self.np_frame, from_=0, to=10, increment=0.5, width=4,
+                    textvariable=self.gap_var).grid(row=0, column=2, padx=(0, 5))
+        self.audition_btn = ttk.Button(self.np_frame, text="Audition Album",
+                                       command=self._toggle_audition)
+        self.audition_btn.grid(row=0, column=3, padx=(0, 5), pady=2)
         self.stop_btn = ttk.Button(self.np_frame, text="\u25a0 Stop",
                                     command=self._stop_playback)
-        self.stop_btn.grid(row=0, column=1, padx=(0, 5), pady=2)
+        self.stop_btn.grid(row=0, column=4, padx=(0, 5), pady=2)
 
         btn_frame = ttk.Frame(left)
         btn_frame.grid(row=2, column=0, sticky="ew", pady=(2, 5))
         ttk.Button(btn_frame, text="Remove Selected",
                    command=self.track_list.remove_selected).pack(side="left")
+        ttk.Button(btn_frame, text="Add Folder...",
+                   command=self._add_folder).pack(side="left", padx=(5, 0))
+        self.watch_btn = ttk.Button(btn_frame, text="Watch Folder...",
+                                    command=self._toggle_watch)
+        self.watch_btn.pack(side="left", padx=(5, 0))
+        self.redo_btn = ttk.Button(btn_frame, text="Redo", width=6, command=self._redo)
+        self.redo_btn.pack(side="right")
+        self.undo_btn = ttk.Button(btn_frame, text="Undo", width=6, command=self._undo)
+        self.undo_btn.pack(side="right", padx=(0, 5))
 
         # Right panel
         right = ttk.Frame(main, width=250)
@@ -73,11 +115,36 @@ class App(ttk.Frame):
 
         ttk.Label(right, text="Band Name:", style="Dim.TLabel").pack(anchor="w", padx=10)
         self.band_var = tk.StringVar()
-        ttk.Entry(right, textvariable=self.band_var).pack(fill="x", padx=10, pady=(0, 5))
+        band_entry = ttk.Entry(right, textvariable=self.band_var)
+        band_entry.pack(fill="x", padx=10, pady=(0, 5))
 
         ttk.Label(right, text="Album Name:", style="Dim.TLabel").pack(anchor="w", padx=10)
         self.album_var = tk.StringVar()
-        ttk.Entry(right, textvariable=self.album_var).pack(fill="x", padx=10, pady=(0, 10))
+        album_entry = ttk.Entry(right, textvariable=self.album_var)
+        album_entry.pack(fill="x", padx=10, pady=(0, 10))
+        self._field_vars = {"band_name": self.band_var, "album_name": self.album_var}
+        self._setting_field = False
+        for name, var in self._field_vars.items():
+            var.trace_add("write", lambda *_, name=name: self._on_field_edited(name))
+        for entry in (band_entry, album_entry):
+            # typing is merged into one undo step until the field loses focus
+            entry.bind("<FocusOut>", lambda e: self.track_list.history.break_merge())
+
+        ttk.Label(right, text="Version:", style="Dim.TLabel").pack(anchor="w", padx=10)
+        self.version_var = tk.StringVar()
+        self.version_box = ttk.Combobox(right, textvariable=self.version_var, state="readonly")
+        self.version_box.pack(fill="x", padx=10, pady=(0, 3))
+        self.version_box.bind("<<ComboboxSelected>>", lambda e: self._switch_version())
+        version_btns = ttk.Frame(right)
+        version_btns.pack(fill="x", padx=10, pady=(0, 10))
+        ttk.Button(version_btns, text="New", width=6,
+                   command=self._new_version).pack(side="left")
+        ttk.Button(version_btns, text="Rename", width=7,
+                   command=self._rename_version).pack(side="left", padx=(5, 0))
+        self.delete_version_btn = ttk.Button(version_btns, text="Delete", width=6,
+                                             command=self._delete_version)
+        self.delete_version_btn.pack(side="left", padx=(5, 0))
+        self._update_versions()
 
         # Duration section
         sep = ttk.Separator(right, orient="horizontal")
@@ -89,11 +156,35 @@ class App(ttk.Frame):
         dur_frame.pack(fill="x", padx=10)
         self.total_label = ttk.Label(dur_frame, text="Total:     0:00")
         self.total_label.pack(anchor="w")
-        self.remaining_label = ttk.Label(dur_frame, text="Remaining: 80:00")
+        l_min, l_sec = divmod(int(CD_LIMIT_SECS), 60)
+        self.remaining_label = ttk.Label(dur_frame, text=f"Remaining: {l_min}:{l_sec:02d}")
         self.remaining_label.pack(anchor="w")
-        self.limit_label = ttk.Label(dur_frame, text="Limit:     80:00", style="Dim.TLabel")
+        self.limit_label = ttk.Label(dur_frame, text=f"Limit:     {l_min}:{l_sec:02d}",
+                                     style="Dim.TLabel")
         self.limit_label.pack(anchor="w")
 
+        self.exact_var = tk.BooleanVar(value=False)
+        exact_cb = ttk.Checkbutton(dur_frame, text="Exact VBR durations",
+                                   variable=self.exact_var, command=self._on_exact_toggled)
+        exact_cb.pack(anchor="w", pady=(4, 0))
+        if not mp3_scan.available:
+            exact_cb.state(["disabled"])
+        self.loudness_var = tk.BooleanVar(value=False)
+        loudness_cb = ttk.Checkbutton(dur_frame, text="Loudness analysis",
+                                      variable=self.loudness_var,
+                                      command=self._on_loudness_toggled)
+        loudness_cb.pack(anchor="w")
+        if not loudness.available:
+            loudness_cb.state(["disabled"])
+        dup_row = ttk.Frame(dur_frame)
+        dup_row.pack(anchor="w", pady=(2, 0))
+        ttk.Label(dup_row, text="Duplicate audio:").pack(side="left")
+        self.duplicates_var = tk.StringVar(value=self.track_list.duplicates)
+        dup_box = ttk.Combobox(dup_row, textvariable=self.duplicates_var, width=7,
+                               values=DUPLICATE_MODES, state="readonly")
+        dup_box.pack(side="left", padx=(5, 0))
+        dup_box.bind("<<ComboboxSelected>>", lambda e: self._on_duplicates_changed())
+
         # Progress bar canvas
         self.bar_canvas = tk.Canvas(right, height=20, bg=COLORS["bg_light"],
                                      highlightthickness=0)
@@ -102,6 +193,22 @@ class App(ttk.Frame):
         self.warning_label = ttk.Label(right, text="", style="Warning.TLabel")
         self.warning_label.pack(anchor="w", padx=10)
 
+        # Disc fit
+        fit_frame = ttk.Frame(right)
+        fit_frame.pack(fill="x", padx=10, pady=(4, 0))
+        ttk.Button(fit_frame, text="Best Fit", command=self._suggest_fit).pack(
+            side="left", expand=True, fill="x", padx=(0, 3))
+        ttk.Button(fit_frame, text="Split", command=self._suggest_split).pack(
+            side="left", expand=True, fill="x", padx=(3, 3))
+        self.discs_var = tk.StringVar(value="auto")
+        ttk.Spinbox(fit_frame, values=("auto", 2, 3, 4, 5, 6), width=5,
+                    textvariable=self.discs_var).pack(side="left")
+        self.fit_label = ttk.Label(right, text="", style="Dim.TLabel", wraplength=220)
+        self.fit_label.pack(anchor="w", padx=10)
+        self.fit_apply_btn = ttk.Button(right, text="Keep Suggested Tracks",
+                                        command=self._apply_fit)
+        self._fit_keep: list[int] | None = None
+
         # Output folder
         ttk.Separator(right, orient="horizontal").pack(fill="x", padx=10, pady=10)
 
@@ -116,6 +223,14 @@ class App(ttk.Frame):
                                       command=self._create_album)
         self.create_btn.pack(fill="x", padx=10, pady=(0, 10))
 
+        # Export progress (shown while an export runs)
+        self.export_frame = ttk.Frame(right)
+        self.export_bar = ttk.Progressbar(self.export_frame, mode="determinate")
+        self.export_bar.pack(side="left", fill="x", expand=True)
+        ttk.Button(self.export_frame, text="Cancel",
+                   command=self._cancel_export).pack(side="left", padx=(5, 0))
+        self.export_label = ttk.Label(right, text="", style="Dim.TLabel")
+
         # Save / Load
         ttk.Separator(right, orient="horizontal").pack(fill="x", padx=10, pady=5)
         sl_frame = ttk.Frame(right)
@@ -131,9 +246,192 @@ class App(ttk.Frame):
             pass
 
     def _on_tracks_changed(self):
-        self.project.tracks = self.track_list.tracks
+        if self._fit_keep is not None or self.fit_label.cget("text"):
+            self._clear_fit_suggestion()  # the track list no longer matches it
         self._update_duration()
+        self._update_undo_buttons()
+
+    # --- Undo ---
+    def _undo(self, event=None):
+        self.track_list.undo()
+        self._update_undo_buttons()
+        return "break"
+
+    def _redo(self, event=None):
+        self.track_list.redo()
+        self._update_undo_buttons()
+        return "break"
+
+    def _update_undo_buttons(self):
+        history = self.track_list.history
+        self.undo_btn.state(["!disabled" if history.can_undo else "disabled"])
+        self.redo_btn.state(["!disabled" if history.can_redo else "disabled"])
+
+    def _on_field_edited(self, name: str):
+        if self._setting_field:
+            return
+        value, old = self._field_vars[name].get(), getattr(self.project, name)
+        if value != old:
+            self.track_list.history.record(("field", name, old, value), merge=name)
+            setattr(self.project, name, value)
+            self._update_undo_buttons()
+
+    def _set_field(self, name: str, value: str):
+        """Apply an album field change coming from undo/redo."""
+        setattr(self.project, name, value)
+        self._setting_field = True
+        try:
+            self._field_vars[name].set(value)
+        finally:
+            self._setting_field = False
+
+    # --- Album versions ---
+    def _update_versions(self):
+        self.version_box.configure(values=self.workspace.names())
+        self.version_var.set(self.workspace.active)
+        self.delete_version_btn.state(
+            ["!disabled" if len(self.workspace.versions) > 1 else "disabled"])
+
+    def _show_project(self, project: AlbumProject, history=None):
+        self.project = project
+        self._setting_field = True
+        try:
+            self.band_var.set(project.band_name)
+            self.album_var.set(project.album_name)
+        finally:
+            self._setting_field = False
+        self.track_list.set_project(project, history)
+
+    def _switch_version(self, name: str | None = None):
+        name = name or self.version_var.get()
+        if name == self.workspace.active:
+            return
+        self._histories[self.workspace.active] = self.track_list.history
+        self._show_project(self.workspace.switch(name), self._histories.pop(name, None))
+        self._update_versions()
+
+    def _ask_version_name(self, title: str, prompt: str, initial: str) -> str | None:
+        name = simpledialog.askstring(title, prompt, initialvalue=initial, parent=self.root)
+        return name.strip() if name and name.strip() else None
+
+    def _new_version(self):
+        name = self._ask_version_name("New Version", "Name for a copy of this version:",
+                                      f"{self.workspace.active} copy")
+        if name is None:
+            return
+        try:
+            self.workspace.add_version(name)
+        except ValueError as e:
+            messagebox.showerror("Version", str(e), parent=self.root)
+            return
+        self._switch_version(name)
 
+    def _rename_version(self):
+        old = self.workspace.active
+        name = self._ask_version_name("Rename Version", "New name:", old)
+        if name is None:
+            return
+        try:
+            self.workspace.rename_version(old, name)
+        except ValueError as e:
+            messagebox.showerror("Version", str(e), parent=self.root)
+            return
+        self._update_versions()
+
+    def _delete_version(self):
+        name = self.workspace.active
+        if not messagebox.askyesno("Delete Version", f"Delete the version \"{name}\"?",
+                                   parent=self.root):
+            return
+        try:
+            self.workspace.remove_version(name)
+        except ValueError as e:
+            messagebox.showerror("Version", str(e), parent=self.root)
+            return
+        self._show_project(self.workspace.switch(self.workspace.active),
+                           self._histories.pop(self.workspace.active, None))
+        self._update_versions()
+
+    def _add_folder(self):
+        root = filedialog.askdirectory(parent=self.root, title="Add Folder")
+        if root:
+            self.track_list.add_folder(root)
+
+    def _toggle_watch(self):
+        if self.track_list.watching:
+            self.track_list.stop_watching()
+            self.watch_btn.configure(text="Watch Folder...")
+            return
+        root = filedialog.askdirectory(parent=self.root, title="Watch Folder")
+        if root:
+            self.track_list.watch_folder(root)
+            self.watch_btn.configure(text="Stop Watching")
+
+    def _on_exact_toggled(self):
+        self.track_list.set_exact_durations(self.exact_var.get())
+
+    def _on_loudness_toggled(self):
+        self.track_list.set_loudness_analysis(self.loudness_var.get())
+
+    def _on_duplicates_changed(self):
+        self.track_list.duplicates = self.duplicates_var.get()
+
+    # --- Disc fit ---
+    def _suggest_fit(self):
+        """Preview the subset that best fills one disc; selected rows are pinned."""
+        tracks = self.project.tracks
+        if not tracks:
+            return
+        tree = self.track_list.tree
+        pinned = [tree.index(iid) for iid in tree.selection()]
+        try:
+            keep = best_subset([t.duration_secs for t in tracks], required=pinned)
+        except ValueError as e:
+            messagebox.showwarning("Best Fit", str(e), parent=self.root)
+            return
+        self.track_list.show_fit_preview([keep])
+        total = sum(tracks[i].duration_secs for i in keep)
+        mins, secs = divmod(int(total), 60)
+        self.fit_label.configure(
+            text=f"Suggested: {len(keep)} of {len(tracks)} tracks, {mins}:{secs:02d}")
+        self._fit_keep = keep
+        if len(keep) < len(tracks):
+            self.fit_apply_btn.pack(fill="x", padx=10, pady=(2, 0), after=self.fit_label)
+
+    def _suggest_split(self):
+        """Preview the running order split over balanced consecutive discs."""
+        tracks = self.project.tracks
+        if not tracks:
+            return
+        value = self.discs_var.get().strip()
+        try:
+            discs = int(value) if value.isdigit() else None
+            groups = split_discs([t.duration_secs for t in tracks], discs)
+        except ValueError as e:
+            messagebox.showwarning("Split", str(e), parent=self.root)
+            return
+        self.track_list.show_fit_preview(groups)
+        lengths = []
+        for group in groups:
+            mins, secs = divmod(int(sum(tracks[i].duration_secs for i in group)), 60)
+            lengths.append(f"{mins}:{secs:02d}")
+        self.fit_label.configure(text=f"{len(groups)} discs: " + ", ".join(lengths))
+        self._clear_fit_suggestion(keep_label=True)
+
+    def _apply_fit(self):
+        keep = set(self._fit_keep or ())
+        drop = [i for i in range(len(self.project.tracks)) if i not in keep]
+        self._clear_fit_suggestion()
+        if drop:
+            self.track_list.remove_tracks(drop)
+
+    def _clear_fit_suggestion(self, keep_label: bool = False):
+        self._fit_keep = None
+        self.fit_apply_btn.pack_forget()
+        if not keep_label:
+            self.fit_label.configure(text="")
+
+    @tracing.traced("App._update_duration", "ui")
     def _update_duration(self):
         total = self.project.total_duration
         rem = self.project.remaining
@@ -145,10 +443,11 @@ class App(ttk.Frame):
         # Progress bar
         self.bar_canvas.delete("all")
         w = self.bar_canvas.winfo_width() or 220
-        ratio = min(total / 4800.0, 1.0)
+        ratio = min(total / CD_LIMIT_SECS, 1.0)
         fill_w = int(w * ratio)
 
-        if total > 4800:
+        over_limit = self.project.over_limit
+        if over_limit:
             color = COLORS["red"]
         elif total > 3600:
             color = COLORS["yellow"]
@@ -158,8 +457,8 @@ class App(ttk.Frame):
         self.bar_canvas.create_rectangle(0, 0, fill_w, 20, fill=color, outline="")
 
         # Warning
-        if self.project.over_limit:
-            over = total - 4800
+        if over_limit:
+            over = total - CD_LIMIT_SECS
             o_min, o_sec = divmod(int(over), 60)
             self.warning_label.configure(text=f"Over limit by {o_min}:{o_sec:02d}")
         else:
@@ -167,7 +466,8 @@ class App(ttk.Frame):
 
         # Create button state
         has_tracks = len(self.project.tracks) > 0
-        self.create_btn.state(["!disabled"] if has_tracks else ["disabled"])
+        can_export = has_tracks and self._export_job is None
+        self.create_btn.state(["!disabled"] if can_export else ["disabled"])
 
     def _select_output(self):
         d = filedialog.askdirectory(title="Select Output Folder")
@@ -188,51 +488,202 @@ class App(ttk.Frame):
                 return
 
         try:
-            created = export_album(self.project, Path(self.output_dir))
+            job = ExportJob(self.project, Path(self.output_dir),
+                            max_workers=self.export_workers)
+        except ValueError as e:
+            messagebox.showerror("Export error", str(e), parent=self.root)
+            return
+        self._export_job = job
+        job.start()
+        self.create_btn.state(["disabled"])
+        self.export_bar.configure(value=0)
+        self.export_frame.pack(fill="x", padx=10, pady=(0, 2), after=self.create_btn)
+        self.export_label.pack(anchor="w", padx=10, pady=(0, 8), after=self.export_frame)
+        self._poll_export()
+
+    def _cancel_export(self):
+        if self._export_job:
+            self._export_job.cancel()
+
+    def _poll_export(self):
+        job = self._export_job
+        self.export_bar.configure(maximum=max(job.bytes_total, 1), value=job.bytes_done)
+        self.export_label.configure(text=f"Exporting {job.files_done}/{job.files_total}")
+        if not job.done:
+            self.after(100, self._poll_export)
+            return
+
+        self._export_job = None
+        self.export_frame.pack_forget()
+        self.export_label.pack_forget()
+        self._update_duration()
+        if isinstance(job.error, ExportCancelled):
+            return
+        if isinstance(job.error, ValueError):
+            messagebox.showerror("Export error", str(job.error), parent=self.root)
+        elif job.error:
+            messagebox.showerror("Error", str(job.error), parent=self.root)
+        else:
+            methods = Counter(job.strategies.values())
+            summary = ", ".join(f"{name} \u00d7{n}" for name, n in methods.most_common())
             messagebox.showinfo(
                 "Done",
-                f"Album created with {len(created)} tracks:\n{Path(self.output_dir) / self.project.album_name}",
+                f"Album created with {len(job.created)} tracks:\n{job.album_dir}"
+                f"\n\nCopied using: {summary}",
                 parent=self.root,
             )
-        except ValueError as e:
-            messagebox.showerror("Export error", str(e), parent=self.root)
-        except Exception as e:
-            messagebox.showerror("Error", str(e), parent=self.root)
 
     def _save(self):
         self.project.band_name = self.band_var.get()
         self.project.album_name = self.album_var.get()
-        result = save_project(self.project, parent=self.root)
+        result = save_workspace(self.workspace, parent=self.root)
         if result:
             messagebox.showinfo("Saved", f"Project saved to:\n{result}", parent=self.root)
 
     def _load(self):
-        proj = load_project(parent=self.root)
-        if proj is None:
+        loaded = load_workspace(parent=self.root)
+        if loaded is None:
             return
+        workspace, stale = loaded
         self._stop_playback()
-        self.project = proj
-        self.band_var.set(proj.band_name)
-        self.album_var.set(proj.album_name)
-        self.track_list.tracks = list(proj.tracks)
-        self.track_list._refresh()
+        if self.track_list.watching:
+            self.track_list.stop_watching()
+            self.watch_btn.configure(text="Watch Folder...")
+        self.workspace = workspace
+        self._histories = {}
+        self._show_project(workspace.project)
+        self._update_versions()
+        if self.exact_var.get():
+            self.track_list.set_exact_durations(True)  # re-measures every track
+        else:
+            self.track_list.refresh_durations(stale)
+        if self.loudness_var.get():
+            self.track_list.start_loudness_analysis()
 
     # --- Playback ---
-    def _on_play_track(self, track):
+    def _on_play_track(self, track, pos: int | None = None):
         if self.player.current_track and track.source_path == self.player.current_track.source_path:
             if self.player.is_paused:
                 self.player.resume()
+                self._schedule_end_check()
             else:
                 self.player.pause()
+                self._cancel_end_check()
         else:
+            self._end_audition()
             self.player.stop()
             self.player.play(track)
+            self._play_pos = pos
+            self._prepare_next()
+            self._schedule_end_check()
         self._update_now_playing()
 
     def _stop_playback(self):
+        self._end_audition()
+        self._cancel_end_check()
         self.player.stop()
         self._update_now_playing()
 
+    def _toggle_audition(self):
+        if self.auditioning:
+            self._stop_playback()
+            return
+        tracks = self.project.tracks
+        if not tracks:
+            return
+        sel = self.track_list.tree.selection()
+        start = min(self.track_list.tree.index(iid) for iid in sel) if sel else 0
+        self._cancel_end_check()
+        self.player.stop()
+        self.auditioning = True
+        self.audition_btn.configure(text="End Audition")
+        self._audition_play(tracks[start], start)
+
+    def _end_audition(self):
+        if self._gap_after:
+            self.root.after_cancel(self._gap_after)
+            self._gap_after = None
+        if self.auditioning:
+            self.auditioning = False
+            self.audition_btn.configure(text="Audition Album")
+
+    def _audition_play(self, track, pos: int):
+        self._gap_after = None
+        self.player.play(track)
+        self._play_pos = pos
+        self._prepare_next()
+        self._schedule_end_check()
+        self._update_now_playing()
+
+    def _gap_ms(self) -> int:
+        try:
+            return max(0, int(float(self.gap_var.get()) * 1000))
+        except ValueError:
+            return 0
+
+    def _next_track(self, track) -> tuple[int, Track] | None:
+        """Album position and track after ``track``. It is looked up at the
+        position it was started from while it is still there, else at its
+        first slot (the rows may have been reordered meanwhile)."""
+        tracks = self.project.tracks
+        pos = self._play_pos
+        if pos is None or pos >= len(tracks) or tracks[pos] is not track:
+            pos = next((i for i, t in enumerate(tracks) if t is track), None)
+        if pos is None or pos + 1 >= len(tracks):
+            return None
+        return pos + 1, tracks[pos + 1]
+
+    def _prepare_next(self):
+        """Prefetch the next track in album order; queue it when auditioning gaplessly."""
+        nxt = self._next_track(self.player.current_track)
+        if nxt is None:
+            return
+        self.player.prefetch(nxt[1])
+        if self.auditioning and self._gap_ms() == 0:
+            self._queued_pos = nxt[0]
+            self.player.queue(nxt[1])
+
+    def _schedule_end_check(self, delay_ms: int | None = None):
+        """Wake once when the current track is due to end, instead of polling."""
+        self._cancel_end_check()
+        remaining = self.player.remaining()
+        if remaining is None:
+            return
+        if delay_ms is None:
+            delay_ms = max(int(remaining * 1000) - END_LEAD_MS, END_RECHECK_MS)
+        self._end_after = self.root.after(delay_ms, self._on_end_check)
+
+    def _cancel_end_check(self):
+        if self._end_after:
+            self.root.after_cancel(self._end_after)
+            self._end_after = None
+
+    def _on_end_check(self):
+        self._end_after = None
+        player = self.player
+        if not player.current_track or player.is_paused:
+            return
+        if player.check_advanced() and player.is_playing:
+            # The mixer has moved on to the queued track by itself; only now
+            # is it safe to queue the one after
+            self._play_pos = self._queued_pos
+            self._prepare_next()
+            self._schedule_end_check()
+            self._update_now_playing()
+            return
+        if player.queued_track or player.is_playing:
+            # estimated durations can be short: wait for the mixer to move on
+            self._schedule_end_check(END_RECHECK_MS)
+            return
+        finished = player.current_track
+        player.current_track = None
+        nxt = self._next_track(finished) if self.auditioning else None
+        if nxt is not None:
+            self._gap_after = self.root.after(self._gap_ms(), self._audition_play, *nxt)
+        else:
+            self._end_audition()
+        self._update_now_playing()
+
     def _update_now_playing(self):
         track = self.player.current_track
         if track and (self.player.is_playing or self.player.is_paused):
@@ -240,16 +691,9 @@ class App(ttk.Frame):
             self.np_label.configure(text=f"{state}: {track.title}")
             self.track_list.update_playing_indicator(track if self.player.is_playing else None)
         else:
-            self.np_label.configure(text="Stopped")
+            self.np_label.configure(text="Audition gap" if self._gap_after else "Stopped")
             self.track_list.update_playing_indicator(None)
 
-    def _poll_playback(self):
-        """Poll pygame mixer to detect when a track finishes."""
-        if self.player.current_track and not self.player.is_playing and not self.player.is_paused:
-            self.player.current_track = None
-            self._update_now_playing()
-        self.root.after(500, self._poll_playback)
-
     def _on_close(self):
         self.player.cleanup()
         self.root.destroy()
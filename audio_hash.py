@@ -0,0 +1,57 @@
+"""Fingerprint the audio of a file, ignoring its tags, so the same render
+imported twice (renamed, or retagged) can be spotted.
+
+Only the audio data found by the file's format provider is hashed: for
+MP3 the bytes between the leading ID3v2 tags and the trailing APEv2 /
+ID3v1 tags, for WAV the data chunk, for FLAC the frames after the
+metadata blocks. The file is mapped and fed to blake2b in large
+chunks; hashlib releases the GIL for those, so hashing on a thread pool
+is limited by the disk rather than by Python.
+"""
+import hashlib
+import mmap
+import os
+
+import formats
+from metadata_cache import MetadataCache
+from models import read_metadata
+
+HASH_FIELD = "audio_hash"
+HASH_CHUNK = 1 << 20
+DIGEST_SIZE = 16
+
+
+def audio_hash(path: str) -> str:
+    """Hex digest of the tag-free audio bytes of ``path``."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    provider = formats.provider_for(path)
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, end = provider.audio_region(mm)
+            view = memoryview(mm)
+            try:
+                for pos in range(start, end, HASH_CHUNK):
+                    h.update(view[pos:min(pos + HASH_CHUNK, end)])
+            finally:
+                view.release()
+    return h.hexdigest()
+
+
+def cached_audio_hash(path: str, cache: MetadataCache) -> str | None:
+    """``audio_hash`` of ``path`` from the metadata cache, hashing (and
+    caching) it only if the file changed. None if it can't be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    fields = cache.get(path, st)
+    if fields and HASH_FIELD in fields:
+        return fields[HASH_FIELD]
+    try:
+        digest = audio_hash(path)
+    except (OSError, ValueError):
+        return None
+    cache.extend(path, st, {HASH_FIELD: digest}, lambda: read_metadata(path))
+    return digest
@@ -1,49 +1,180 @@
-import pygame
+import io
+import os
+import threading
+import time
+from pathlib import Path
+
 from models import Track
 
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+pygame = None  # imported when something is first played
+
+PREFETCH_LIMIT = 3  # tracks held in memory ahead of playback
+# The mixer position restarts at zero when a queued track starts; when it
+# trails the wall clock by more than this, the switch has happened.
+SWITCH_SLACK_SECS = 1.0
+
+
+class Prefetcher:
+    """Reads upcoming tracks into memory on a background thread, so starting
+    them does not wait on a slow or sleeping drive."""
+
+    def __init__(self, limit: int = PREFETCH_LIMIT):
+        self.limit = limit
+        self._data: dict[str, bytes] = {}
+        self._loading: set[str] = set()
+        self._lock = threading.Lock()
+
+    def prefetch(self, path: str):
+        with self._lock:
+            if path in self._data or path in self._loading:
+                return
+            self._loading.add(path)
+        threading.Thread(target=self._load, args=(path,), daemon=True).start()
+
+    def _load(self, path: str):
+        try:
+            data = Path(path).read_bytes()
+        except OSError:
+            data = None
+        with self._lock:
+            self._loading.discard(path)
+            if data is None:
+                return
+            self._data[path] = data
+            while len(self._data) > self.limit:
+                del self._data[next(iter(self._data))]  # oldest first
+
+    def take(self, path: str) -> io.BytesIO | None:
+        """The prefetched bytes as a file object, or None if not ready."""
+        with self._lock:
+            data = self._data.pop(path, None)
+        return io.BytesIO(data) if data is not None else None
+
 
 class AudioPlayer:
-    """Thin wrapper around pygame.mixer.music for MP3 playback."""
+    """Thin wrapper around pygame.mixer.music for MP3, WAV and FLAC playback.
+
+    The player does not poll: ``remaining()`` tells the caller when the
+    current track is due to end so it can schedule one check for then.
+    A track can be queued behind the current one for gapless playback;
+    ``check_advanced()`` reports when the mixer has really switched to it,
+    since the estimated duration may be off.
+    pygame and the audio device are only set up on the first ``play()``.
+    """
 
     def __init__(self):
-        pygame.mixer.init()
+        self._ready = False
         self.current_track: Track | None = None
+        self.queued_track: Track | None = None
+        self.prefetcher = Prefetcher()
         self._paused = False
+        self._started = 0.0  # monotonic time the current track started
+        self._paused_at = 0.0
+        self._last_pos = 0  # mixer position (ms) at the previous check
+
+    def _ensure_mixer(self):
+        global pygame
+        if pygame is None:
+            import pygame
+        if not self._ready:
+            pygame.mixer.init()
+            self._ready = True
+
+    def _source(self, track: Track):
+        data = self.prefetcher.take(track.source_path)
+        if data is None:
+            return (track.source_path,)
+        # pygame can't sniff an in-memory file, so pass the type along
+        return data, Path(track.source_path).suffix.lstrip(".").lower() or "mp3"
 
     def play(self, track: Track):
-        pygame.mixer.music.load(track.source_path)
+        self._ensure_mixer()
+        pygame.mixer.music.load(*self._source(track))
         pygame.mixer.music.play()
         self.current_track = track
+        self.queued_track = None
         self._paused = False
+        self._started = time.monotonic()
+        self._last_pos = 0
+
+    def queue(self, track: Track):
+        """Start ``track`` straight after the current one, without a gap."""
+        pygame.mixer.music.queue(*self._source(track))
+        self.queued_track = track
+
+    def check_advanced(self) -> bool:
+        """Whether the mixer has started the queued track, which then becomes
+        the current one. The mixer position restarting from zero (or the
+        mixer stopping, if the queued track already played out as well)
+        confirms the switch; the estimated end time alone does not."""
+        if not self.queued_track or self._paused:
+            return False
+        pos = pygame.mixer.music.get_pos()
+        if pygame.mixer.music.get_busy() and pos >= 0:
+            restarted = pos < self._last_pos \
+                or self.elapsed() - pos / 1000.0 > SWITCH_SLACK_SECS
+            self._last_pos = pos
+            if not restarted:
+                return False
+        else:
+            pos = 0
+        self.current_track = self.queued_track
+        self.queued_track = None
+        self._started = time.monotonic() - pos / 1000.0
+        self._last_pos = pos
+        return True
+
+    def prefetch(self, track: Track):
+        self.prefetcher.prefetch(track.source_path)
 
     def pause(self):
-        if self.is_playing:
+        if self._ready and self.is_playing:
             pygame.mixer.music.pause()
             self._paused = True
+            self._paused_at = time.monotonic()
 
     def resume(self):
         if self._paused:
             pygame.mixer.music.unpause()
             self._paused = False
+            self._started += time.monotonic() - self._paused_at
 
     def stop(self):
-        pygame.mixer.music.stop()
+        if self._ready:
+            pygame.mixer.music.stop()
         self.current_track = None
+        self.queued_track = None
         self._paused = False
 
     @property
     def is_playing(self) -> bool:
-        return pygame.mixer.music.get_busy() and not self._paused
+        return self._ready and pygame.mixer.music.get_busy() and not self._paused
 
     @property
     def is_paused(self) -> bool:
         return self._paused
 
+    def elapsed(self) -> float:
+        """Seconds played of the current track."""
+        end = self._paused_at if self._paused else time.monotonic()
+        return end - self._started
+
+    def remaining(self) -> float | None:
+        """Seconds until the current track should end, or None if idle."""
+        if not self.current_track:
+            return None
+        return max(0.0, self.current_track.duration_secs - self.elapsed())
+
     def get_pos(self) -> float:
         """Current playback position in seconds, or -1 if not playing."""
+        if not self._ready:
+            return -1.0
         pos = pygame.mixer.music.get_pos()
         return pos / 1000.0 if pos >= 0 else -1.0
 
     def cleanup(self):
-        pygame.mixer.music.stop()
-        pygame.mixer.quit()
+        if self._ready:
+            pygame.mixer.music.stop()
+            pygame.mixer.quit()
+            self._ready = False
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Compare the header-only MP3 reader against the mutagen double parse.
+
+Usage: python benchmarks/bench_metadata.py MUSIC_DIR [--limit 3000]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import read_metadata, read_metadata_mutagen  # noqa: E402
+from mp3_header import read_mp3_info  # noqa: E402
+
+
+def collect(root: str, limit: int) -> list[str]:
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(".mp3"):
+                paths.append(os.path.join(dirpath, name))
+                if len(paths) >= limit:
+                    return paths
+    return paths
+
+
+def timed(fn, paths):
+    start = time.perf_counter()
+    results = [fn(p) for p in paths]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="directory to scan for MP3 files")
+    parser.add_argument("--limit", type=int, default=3000)
+    args = parser.parse_args()
+
+    paths = collect(args.root, args.limit)
+    if not paths:
+        sys.exit(f"No MP3 files found under {args.root}")
+
+    # Warm the OS page cache so both runs measure parsing, not disk
+    timed(read_mp3_info, paths)
+
+    slow_t, slow = timed(read_metadata_mutagen, paths)
+    fast_t, fast = timed(read_mp3_info, paths)
+    mixed_t, _ = timed(read_metadata, paths)
+
+    fallbacks = sum(1 for r in fast if r is None)
+    mismatches = [
+        p for p, a, b in zip(paths, fast, slow)
+        if a is not None and (a["title"] != b["title"]
+                              or abs(a["duration_secs"] - b["duration_secs"]) > 0.05)
+    ]
+
+    n = len(paths)
+    print(f"files:                {n}")
+    print(f"mutagen MP3 + ID3:    {slow_t:8.3f} s  ({slow_t / n * 1e3:.3f} ms/file)")
+    print(f"header-only reader:   {fast_t:8.3f} s  ({fast_t / n * 1e3:.3f} ms/file)")
+    print(f"read_metadata:        {mixed_t:8.3f} s  (with fallback)")
+    print(f"speedup:              {slow_t / fast_t:8.1f}x")
+    print(f"mutagen fallbacks:    {fallbacks}")
+    print(f"mismatches:           {len(mismatches)}")
+    for p in mismatches[:10]:
+        print(f"  {p}")
+
+
+if __name__ == "__main__":
+    main()
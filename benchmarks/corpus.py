@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Generate a reproducible synthetic MP3 corpus for benchmarks.
+
+Usage: python benchmarks/corpus.py OUT_DIR --count 1000 [--seed 0] [--frames 100]
+
+Files are valid MPEG-1 Layer III frame streams (random payload, so they
+parse like real MP3s but do not play) in a rotating mix of variants: CBR
+with and without an ID3v2 tag, CBR with an Info/LAME header, VBR with a
+Xing or VBRI header, VBR without any header, and an ID3v1 trailer. The
+same count, seed and frame count always give byte-identical files.
+"""
+import argparse
+import io
+import json
+import random
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mutagen.id3 import ID3, TIT2, TPE1  # noqa: E402
+
+# MPEG-1 Layer III bitrates (kbps) by index
+BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+CBR_INDEX = 9  # 128 kbps
+VBR_INDEXES = [9, 10, 11, 12, 13]
+SAMPLE_RATE = 44100
+VARIANTS = ("cbr", "cbr_id3", "cbr_info_lame", "vbr_xing", "vbr_vbri", "vbr_bare", "cbr_id3v1")
+CORPUS_FILE = "corpus.json"
+CORPUS_VERSION = 1  # bump when the generated bytes change
+
+
+def _header(index: int) -> bytes:
+    # sync, MPEG-1, Layer III, no CRC; 44.1 kHz, no padding; joint stereo
+    return bytes([0xFF, 0xFB, index << 4, 0x40])
+
+
+def _frame_len(index: int) -> int:
+    return 144 * BITRATES[index] * 1000 // SAMPLE_RATE
+
+
+def _vbr_frame(kind: str, frames: int, audio_bytes: int, lame: bool) -> bytes:
+    f = bytearray(_frame_len(CBR_INDEX))
+    f[:4] = _header(CBR_INDEX)
+    if kind in ("Xing", "Info"):
+        # side info is 32 bytes for MPEG-1 stereo
+        f[36:40] = kind.encode()
+        f[40:44] = struct.pack(">I", 0x0F)  # frames, bytes, TOC, quality
+        f[44:48] = struct.pack(">I", frames)
+        f[48:52] = struct.pack(">I", audio_bytes)
+        f[52:152] = bytes(range(100))
+        f[152:156] = struct.pack(">I", 50)
+        if lame:
+            tag = bytearray(b"LAME3.100" + bytes(27))
+            delay, padding = 576, 1000
+            tag[21] = delay >> 4
+            tag[22] = ((delay & 0xF) << 4) | (padding >> 8)
+            tag[23] = padding & 0xFF
+            f[156:156 + len(tag)] = tag
+    else:
+        f[36:40] = b"VBRI"
+        f[40:42] = struct.pack(">H", 1)
+        f[46:50] = struct.pack(">I", audio_bytes)
+        f[50:54] = struct.pack(">I", frames)
+        f[54:62] = struct.pack(">HHHH", 0, 1, 2, 0)  # empty TOC, 2-byte entries
+    return bytes(f)
+
+
+def make_mp3(variant: str, frames: int, seed: int, title: str) -> bytes:
+    rng = random.Random(seed)
+    vbr = variant.startswith("vbr")
+    indexes = [rng.choice(VBR_INDEXES) if vbr else CBR_INDEX for _ in range(frames)]
+    audio = bytearray()
+    for index in indexes:
+        audio += _header(index) + rng.randbytes(_frame_len(index) - 4)
+
+    out = bytearray()
+    if variant in ("cbr_id3", "cbr_info_lame", "vbr_xing"):
+        tags = ID3()
+        tags.add(TIT2(encoding=3, text=title))
+        tags.add(TPE1(encoding=3, text="Synthetic"))
+        buf = io.BytesIO()
+        tags.save(buf, padding=lambda info: 256)
+        out += buf.getvalue()
+    if variant == "cbr_info_lame":
+        out += _vbr_frame("Info", frames, len(audio), lame=True)
+    elif variant == "vbr_xing":
+        out += _vbr_frame("Xing", frames, len(audio), lame=True)
+    elif variant == "vbr_vbri":
+        out += _vbr_frame("VBRI", frames, len(audio), lame=False)
+    out += audio
+    if variant == "cbr_id3v1":
+        out += b"TAG" + title.encode("latin-1", "replace")[:30].ljust(30, b"\0") + bytes(95)
+    return bytes(out)
+
+
+def generate(out_dir, count: int, seed: int = 0, frames: int = 100) -> list[str]:
+    """Create (or reuse) the corpus in ``out_dir``; returns paths in order."""
+    out_dir = Path(out_dir)
+    spec = {"version": CORPUS_VERSION, "count": count, "seed": seed, "frames": frames}
+    marker = out_dir / CORPUS_FILE
+    names = [f"{i:05d}_{VARIANTS[i % len(VARIANTS)]}.mp3" for i in range(count)]
+    try:
+        if json.loads(marker.read_text(encoding="utf-8")) == spec:
+            return [str(out_dir / n) for n in names]
+    except (OSError, ValueError):
+        pass
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    for i, name in enumerate(names):
+        variant = VARIANTS[i % len(VARIANTS)]
+        # vary length +-50% around the requested frame count
+        n = max(10, int(frames * rng.uniform(0.5, 1.5)))
+        data = make_mp3(variant, n, rng.getrandbits(32), f"Track {i:05d}")
+        (out_dir / name).write_bytes(data)
+    marker.write_text(json.dumps(spec), encoding="utf-8")
+    return [str(out_dir / n) for n in names]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=100,
+                        help="average MPEG frames per file (about 26 ms each)")
+    args = parser.parse_args()
+    paths = generate(args.out_dir, args.count, args.seed, args.frames)
+    print(f"{len(paths)} files in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Run the benchmark suite on synthetic corpora and compare with a baseline.
+
+Usage: python benchmarks/run.py [--sizes 10,100,1000] [--repeat 3]
+                                [--output results.json] [--baseline old.json]
+
+Each benchmark runs ``--repeat`` times per corpus size and the best time is
+kept. Results are written as JSON; with ``--baseline`` (an earlier output
+file) every result is compared and slowdowns beyond ``--threshold`` are
+reported as regressions. Track list benchmarks need a display and are
+skipped without one.
+"""
+import argparse
+import dataclasses
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+# Keep benchmark runs away from the user's metadata cache
+os.environ["ALBUMPLANNER_CACHE_DIR"] = tempfile.mkdtemp(prefix="albumplanner-bench-cache-")
+
+from corpus import generate  # noqa: E402
+from album_service import export_album  # noqa: E402
+from metadata_cache import MetadataCache  # noqa: E402
+from models import AlbumProject, Track  # noqa: E402
+from project_io import read_project, write_project  # noqa: E402
+
+DRAG_MOVES = 100
+RESULTS_VERSION = 1
+
+
+class Skipped(Exception):
+    pass
+
+
+def best_of(repeat: int, fn, setup=None) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class Suite:
+    def __init__(self, paths: list[str], repeat: int, workdir: Path):
+        self.paths = paths
+        self.repeat = repeat
+        self.workdir = workdir
+        self._tracks: list[Track] | None = None
+        self._tk = None
+
+    def tracks(self) -> list[Track]:
+        if self._tracks is None:
+            self._tracks = [Track.from_file(p) for p in self.paths]
+        return self._tracks
+
+    def project(self) -> AlbumProject:
+        return AlbumProject(band_name="Bench", album_name="Bench",
+                            tracks=[dataclasses.replace(t) for t in self.tracks()])
+
+    # --- metadata ---
+    def bench_from_file_cold(self):
+        return best_of(self.repeat,
+                       lambda cache: [Track.from_file(p, cache=cache) for p in self.paths],
+                       setup=lambda: MetadataCache(":memory:"))
+
+    def bench_from_file_warm(self):
+        cache = MetadataCache(":memory:")
+        for p in self.paths:
+            Track.from_file(p, cache=cache)
+        return best_of(self.repeat, lambda _: [Track.from_file(p, cache=cache)
+                                               for p in self.paths])
+
+    # --- track list (hidden Tk root) ---
+    def _track_list(self):
+        if self._tk is None:
+            try:
+                import tkinter as tk
+                root = tk.Tk()
+            except Exception as e:  # no display
+                raise Skipped(f"Tk unavailable: {e}".splitlines()[0])
+            root.withdraw()
+            from track_list import TrackList
+            tl = TrackList(root)
+            tl.pack(fill="both", expand=True)
+            self._tk = (root, tl)
+        return self._tk
+
+    def bench_tracklist_add_files(self):
+        root, tl = self._track_list()
+
+        def run(_):
+            tl.add_files(self.paths)
+            while tl._import_job is not None:
+                root.update()
+                time.sleep(0.001)
+            root.update()
+
+        return best_of(self.repeat, run, setup=lambda: tl.set_project(AlbumProject()))
+
+    def bench_tracklist_refresh(self):
+        root, tl = self._track_list()
+
+        def run(project):
+            tl.set_project(project)
+            root.update()
+
+        return best_of(self.repeat, run, setup=self.project)
+
+    def bench_drag_reorder(self):
+        root, tl = self._track_list()
+        n = len(self.paths)
+        rng = random.Random(0)
+        moves = [(rng.randrange(n), rng.randrange(n)) for _ in range(DRAG_MOVES)]
+
+        def run(_):
+            for src, dst in moves:
+                tl._move_row(src, dst)
+                tl._notify_change()
+                root.update_idletasks()
+            root.update()
+
+        return best_of(self.repeat, run, setup=lambda: tl.set_project(self.project()))
+
+    # --- export ---
+    def _export(self, mode: str, incremental: bool, fresh: bool):
+        target = self.workdir / f"export-{mode}"
+
+        def setup():
+            if fresh:
+                shutil.rmtree(target, ignore_errors=True)
+            return self.project()
+
+        return best_of(self.repeat,
+                       lambda project: export_album(project, target, mode=mode,
+                                                    incremental=incremental),
+                       setup=setup)
+
+    def bench_export_stream(self):
+        return self._export("stream", incremental=False, fresh=True)
+
+    def bench_export_copy(self):
+        return self._export("copy", incremental=False, fresh=True)
+
+    def bench_export_unchanged(self):
+        """Re-export into a folder that already holds the same album."""
+        export_album(self.project(), self.workdir / "export-stream", incremental=True)
+        return self._export("stream", incremental=True, fresh=False)
+
+    # --- projects ---
+    def _round_trip(self, name: str):
+        path = self.workdir / name
+
+        def run(project):
+            write_project(project, path)
+            read_project(path)
+
+        return best_of(self.repeat, run, setup=self.project)
+
+    def bench_save_load_json(self):
+        return self._round_trip("bench.albumplan")
+
+    def bench_save_load_compact(self):
+        return self._round_trip("bench.albumpack")
+
+    def close(self):
+        if self._tk is not None:
+            self._tk[0].destroy()
+
+
+BENCHMARKS = [name[len("bench_"):] for name in vars(Suite) if name.startswith("bench_")]
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print a comparison table; returns the keys that regressed."""
+    old = baseline.get("results", {})
+    regressions = []
+    print(f"\n{'benchmark':40} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for key, entry in results.items():
+        base = old.get(key)
+        if "seconds" not in entry or not base or "seconds" not in base:
+            continue
+        ratio = entry["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{key:40} {base['seconds']:10.4f} {entry['seconds']:10.4f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000",
+                        help="comma-separated corpus sizes (up to 10000)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=100, help="average frames per file")
+    parser.add_argument("--only", help="comma-separated benchmarks to run: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--corpus-dir", default=str(Path(tempfile.gettempdir())
+                                                   / "albumplanner-bench-corpus"),
+                        help="where generated corpora are kept between runs")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default 0.10)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        sys.exit(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for size in sizes:
+        corpus = Path(args.corpus_dir) / f"{size}-{args.seed}-{args.frames}"
+        paths = generate(corpus, size, args.seed, args.frames)
+        with tempfile.TemporaryDirectory(prefix="albumplanner-bench-") as work:
+            suite = Suite(paths, args.repeat, Path(work))
+            try:
+                for name in selected:
+                    key = f"{name}/{size}"
+                    try:
+                        runs = getattr(suite, f"bench_{name}")()
+                    except Skipped as e:
+                        results[key] = {"skipped": str(e)}
+                        print(f"{key:40} skipped ({e})")
+                        continue
+                    results[key] = {"seconds": min(runs), "runs": runs, "items": size}
+                    per_item = min(runs) / size * 1e6
+                    print(f"{key:40} {min(runs):10.4f} s  {per_item:10.1f} us/file")
+            finally:
+                suite.close()
+
+    report = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "sizes": sizes,
+            "seed": args.seed,
+            "frames": args.frames,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            if args.fail_on_regression:
+                sys.exit(1)
+    shutil.rmtree(os.environ["ALBUMPLANNER_CACHE_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
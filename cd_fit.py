@@ -0,0 +1,113 @@
+"""Fitting tracks onto 80-minute discs.
+
+Durations are rounded up to whole seconds, so every suggestion really
+fits. The subset search is an exact subset-sum over reachable totals, kept
+as bits of a Python int: adding a track is one shift-and-or over
+``limit`` bits, so several hundred tracks take a few milliseconds.
+"""
+import math
+
+from models import CD_LIMIT_SECS
+
+
+def _seconds(durations) -> list[int]:
+    return [max(0, math.ceil(d - 1e-6)) for d in durations]
+
+
+def best_subset(durations, limit: float = CD_LIMIT_SECS, required=()) -> list[int]:
+    """Indices (in order) of the tracks that fill ``limit`` as fully as possible.
+
+    Tracks in ``required`` are always included. Raises ValueError if they
+    alone do not fit.
+    """
+    secs = _seconds(durations)
+    required = sorted(set(required))
+    capacity = int(limit) - sum(secs[i] for i in required)
+    if capacity < 0:
+        raise ValueError("The required tracks alone exceed the disc limit")
+    pinned = set(required)
+    optional = [i for i in range(len(secs)) if i not in pinned]
+
+    mask = (1 << (capacity + 1)) - 1
+    reachable = 1  # bit t set: some subset of the tracks so far totals t seconds
+    history = []
+    for i in optional:
+        history.append(reachable)
+        reachable |= (reachable << secs[i]) & mask
+
+    # Walk back from the best total, taking a track whenever the total
+    # was not already reachable without it
+    total = reachable.bit_length() - 1
+    chosen = set(pinned)
+    for i, before in zip(reversed(optional), reversed(history)):
+        if not (before >> total) & 1:
+            chosen.add(i)
+            total -= secs[i]
+    return sorted(chosen)
+
+
+def _pack(secs: list[int], cap: int, discs: int) -> list[int] | None:
+    """Start index of each disc when filling discs up to ``cap`` in order,
+    or None if ``discs`` are not enough."""
+    starts = [0]
+    used = 0
+    for i, s in enumerate(secs):
+        if used + s > cap:
+            starts.append(i)
+            used = 0
+            if len(starts) > discs:
+                return None
+        used += s
+    return starts
+
+
+def split_discs(durations, discs: int | None = None, limit: float = CD_LIMIT_SECS) -> list[list[int]]:
+    """Split the running order into consecutive discs.
+
+    With ``discs`` unset, the fewest discs are used. The longest disc is
+    kept as short as possible (binary search on it, one-second steps), so
+    the discs come out balanced. Raises ValueError if a track is longer
+    than ``limit`` or the tracks do not fit on ``discs`` discs.
+    """
+    secs = _seconds(durations)
+    if not secs:
+        return []
+    cap = int(limit)
+    if max(secs) > cap:
+        raise ValueError("A track is longer than one disc")
+    minimum = len(_pack(secs, cap, len(secs)))
+    if discs is None:
+        discs = minimum
+    elif discs < minimum:
+        raise ValueError(f"The tracks need at least {minimum} discs")
+    discs = min(discs, len(secs))
+
+    lo, hi = max(max(secs), math.ceil(sum(secs) / discs)), cap
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _pack(secs, mid, discs) is None:
+            lo = mid + 1
+        else:
+            hi = mid
+    starts = _pack(secs, lo, discs)
+    # Greedy packing may use fewer discs than asked; split the last discs
+    # further (never making the longest one longer) until there are enough
+    while len(starts) < discs:
+        bounds = starts + [len(secs)]
+        k = max((j for j in range(len(starts)) if bounds[j + 1] - bounds[j] > 1),
+                key=lambda j: sum(secs[bounds[j]:bounds[j + 1]]))
+        starts.insert(k + 1, _midpoint(secs, bounds[k], bounds[k + 1]))
+    bounds = starts + [len(secs)]
+    return [list(range(bounds[j], bounds[j + 1])) for j in range(len(starts))]
+
+
+def _midpoint(secs: list[int], start: int, end: int) -> int:
+    """Split point of secs[start:end] that best halves its length."""
+    total = sum(secs[start:end])
+    best, best_diff, run = start + 1, None, 0
+    for i in range(start, end - 1):
+        run += secs[i]
+        diff = abs(total - 2 * run)
+        if best_diff is None or diff < best_diff:
+            best, best_diff = i + 1, diff
+    return best
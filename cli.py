@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Build albums without the GUI (imports neither tkinter nor pygame).
+
+    python cli.py build PROJECT [PROJECT ...] --output DIR
+    python cli.py build --manifest batch.json --output DIR
+
+A batch manifest is JSON listing albums, each with ``band_name``,
+``album_name`` and either ``tracks`` (audio file paths, in order) or ``folder``
+(every audio file under it, in name order); ``output`` overrides ``--output``
+for that album. Albums are built in parallel.
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from album_service import DEFAULT_EXPORT_WORKERS, EXPORT_MODES, export_album
+from folder_watch import iter_audio_files
+from import_worker import ImportJob
+from models import CD_LIMIT_SECS, AlbumProject
+from project_io import read_project, relink_missing
+import tracing
+
+DEFAULT_JOBS = 4
+
+
+class AlbumSpec:
+    """One album to build: a project file or a manifest entry."""
+
+    def __init__(self, label: str, output: str | None, project_path: str | None = None,
+                 entry: dict | None = None):
+        self.label = label
+        self.output = output
+        self.project_path = project_path
+        self.entry = entry
+
+
+def load_manifest(path: str) -> list[AlbumSpec]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    base = Path(path).parent
+    specs = []
+    for n, entry in enumerate(data.get("albums", []), 1):
+        if "tracks" not in entry and "folder" not in entry:
+            raise ValueError(f"{path}: album {n} has neither 'tracks' nor 'folder'")
+        entry = dict(entry)
+        # Relative paths are relative to the manifest
+        if "folder" in entry:
+            entry["folder"] = str(base / entry["folder"])
+        if "tracks" in entry:
+            entry["tracks"] = [str(base / t) for t in entry["tracks"]]
+        label = f"{entry.get('band_name', '')} - {entry.get('album_name', '')}".strip(" -")
+        specs.append(AlbumSpec(label or f"album {n}", entry.get("output"), entry=entry))
+    return specs
+
+
+def build_project(spec: AlbumSpec, search: list[str]) -> AlbumProject:
+    if spec.project_path:
+        project, missing = read_project(spec.project_path)
+        if missing and search:
+            missing = relink_missing(project, missing, search)
+        if missing:
+            names = ", ".join(project.tracks[i].original_filename for i in missing[:5])
+            raise FileNotFoundError(f"{len(missing)} source file(s) missing: {names}")
+        return project
+    entry = spec.entry
+    paths = entry["tracks"] if "tracks" in entry else iter_audio_files(entry["folder"])
+    job = ImportJob(paths)
+    job.start()
+    tracks = job.wait()
+    if job.errors:
+        raise ValueError(f"{len(job.errors)} file(s) could not be read:\n{job.error_report()}")
+    return AlbumProject(band_name=entry.get("band_name", ""),
+                        album_name=entry.get("album_name", ""), tracks=tracks)
+
+
+def build_album(spec: AlbumSpec, args) -> str:
+    """Import and export one album; returns a one-line summary."""
+    project = build_project(spec, args.search)
+    if not project.tracks:
+        raise ValueError("No tracks")
+    if project.over_limit:
+        over = int(project.total_duration - CD_LIMIT_SECS)
+        message = f"over the disc limit by {over // 60}:{over % 60:02d}"
+        if args.strict:
+            raise ValueError(message)
+        print(f"warning: {spec.label}: {message}", file=sys.stderr)
+    created = export_album(project, Path(spec.output or args.output),
+                           max_workers=args.workers, mode=args.mode,
+                           incremental=not args.full)
+    mins, secs = divmod(int(project.total_duration), 60)
+    folder = Path(created[0]).parent if created else ""
+    return f"{len(project.tracks)} tracks, {mins}:{secs:02d} -> {folder}"
+
+
+def cmd_build(args) -> int:
+    specs = [AlbumSpec(p, None, project_path=p) for p in args.projects]
+    for manifest in args.manifest:
+        specs.extend(load_manifest(manifest))
+    if not specs:
+        print("Nothing to build: give project files or --manifest", file=sys.stderr)
+        return 2
+    if not args.output and any(s.output is None for s in specs):
+        print("--output is required", file=sys.stderr)
+        return 2
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [(spec, pool.submit(build_album, spec, args)) for spec in specs]
+        for spec, fut in futures:
+            try:
+                print(f"ok: {spec.label}: {fut.result()}")
+            except Exception as e:
+                failed += 1
+                print(f"FAILED: {spec.label}: {e}", file=sys.stderr)
+    print(f"{len(specs) - failed} of {len(specs)} album(s) built")
+    return 1 if failed else 0
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # --trace[=FILE] may go anywhere; argparse can't take an optional value
+    # there without swallowing the subcommand or a project path
+    trace_path = tracing.requested(argv)
+    argv = [a for a in argv if a != tracing.FLAG and not a.startswith(tracing.FLAG + "=")]
+    parser = argparse.ArgumentParser(
+        prog="albumplanner", description=__doc__.splitlines()[0],
+        epilog=f"{tracing.FLAG}[=FILE] anywhere on the command line (or {tracing.ENV_VAR}) "
+               f"records a Chrome trace of the run (default file {tracing.default_path()})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="export albums from project files or a batch manifest")
+    build.add_argument("projects", nargs="*", help=".albumplan or .albumpack files")
+    build.add_argument("--manifest", action="append", default=[],
+                       help="JSON batch manifest (may be repeated)")
+    build.add_argument("-o", "--output", help="output folder for albums without their own")
+    build.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS,
+                       help="albums built at once (default %(default)s)")
+    build.add_argument("--workers", type=int, default=DEFAULT_EXPORT_WORKERS,
+                       help="parallel file copies per album (default %(default)s)")
+    build.add_argument("--mode", choices=EXPORT_MODES, default="stream")
+    build.add_argument("--full", action="store_true",
+                       help="rewrite every file instead of updating an earlier export")
+    build.add_argument("--search", action="append", default=[],
+                       help="folder to look in for missing project sources (may be repeated)")
+    build.add_argument("--strict", action="store_true",
+                       help="fail albums that are over the 80-minute limit")
+    build.set_defaults(func=cmd_build)
+    args = parser.parse_args(argv)
+    if trace_path:
+        tracing.enable(trace_path)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
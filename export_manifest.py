@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_NAME = ".albumplanner-manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    """Record of what an export wrote into an album folder.
+
+    Maps each exported file name to its source (path, size, mtime and,
+    when the copy passed through Python anyway, a content hash) and the
+    tags written, so later exports can tell which files are already
+    correct, which only need renaming or re-tagging, and which must be
+    copied again. Sources are never read just to hash them.
+    """
+
+    def __init__(self, album_dir: Path, entries: dict[str, dict] | None = None):
+        self.album_dir = album_dir
+        self.entries: dict[str, dict] = entries or {}
+
+    @property
+    def path(self) -> Path:
+        return self.album_dir / MANIFEST_NAME
+
+    @classmethod
+    def load(cls, album_dir: Path) -> "Manifest":
+        try:
+            data = json.loads((album_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(album_dir)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(album_dir)
+        return cls(album_dir, data.get("entries", {}))
+
+    def save(self):
+        """Write atomically so a crash never leaves a half-written manifest."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "entries": self.entries}),
+                       encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def make_entry(source_path: str, tags: dict, content_hash: str | None = None) -> dict:
+        st = os.stat(source_path)
+        return {
+            "source_path": source_path,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hash": content_hash,
+            "tags": tags,
+        }
+
+    def source_unchanged(self, entry: dict, source_path: str) -> bool:
+        """True if ``source_path`` still has the content recorded in ``entry``."""
+        if entry.get("source_path") != source_path:
+            return False
+        try:
+            st = os.stat(source_path)
+        except OSError:
+            return False
+        if st.st_size != entry.get("size"):
+            return False
+        if st.st_mtime_ns == entry.get("mtime_ns"):
+            return True
+        # Touched but maybe not modified: compare content, if it was hashed
+        if not entry.get("hash") or file_hash(source_path) != entry["hash"]:
+            return False
+        entry["mtime_ns"] = st.st_mtime_ns
+        return True
+
+    def plan(self, sources: list[str], names: list[str]) -> tuple[list[str | None], list[str]]:
+        """Match wanted files to reusable existing ones.
+
+        Returns, per wanted index, the existing file name to reuse (or None
+        to export afresh), plus the names of recorded files nobody reuses.
+        """
+        by_source: dict[str, list[str]] = {}
+        for name, entry in self.entries.items():
+            if (self.album_dir / name).exists() \
+                    and self.source_unchanged(entry, entry.get("source_path")):
+                by_source.setdefault(entry["source_path"], []).append(name)
+
+        reuse: list[str | None] = [None] * len(sources)
+        # Same source and same name first, so plain re-exports touch nothing
+        for i, (source, name) in enumerate(zip(sources, names)):
+            candidates = by_source.get(source, [])
+            if name in candidates:
+                candidates.remove(name)
+                reuse[i] = name
+        for i, source in enumerate(sources):
+            if reuse[i] is None and by_source.get(source):
+                reuse[i] = by_source[source].pop(0)
+
+        used = set(n for n in reuse if n)
+        stale = [n for n in self.entries if n not in used]
+        return reuse, stale
@@ -0,0 +1,144 @@
+"""Byte copying for exports, using the fastest mechanism the OS offers.
+
+Strategies are tried in order: a reflink clone (FICLONE, whole files only),
+``os.copy_file_range``, ``os.sendfile`` and finally a buffered read/write
+loop. A strategy that fails part-way hands over to the next one at the
+current offset.
+"""
+import functools
+import os
+import sys
+
+KERNEL_CHUNK = 8 * 1024 * 1024
+BUFFER_CHUNK = 1024 * 1024
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int)
+
+REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+SENDFILE = "sendfile"
+BUFFERED = "buffered"
+
+
+class CopyCancelled(Exception):
+    pass
+
+
+def try_reflink(src_fd: int, dst_fd: int) -> bool:
+    """Clone the whole of src into dst sharing extents; False if unsupported."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _copy_file_range(src_fd, dst_fd, offset, length, dst_offset):
+    return os.copy_file_range(src_fd, dst_fd, length, offset, dst_offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, length, dst_offset):
+    os.lseek(dst_fd, dst_offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, length)
+
+
+def _buffered(src_fd, dst_fd, offset, length, dst_offset, hasher=None):
+    data = read_at(src_fd, min(length, BUFFER_CHUNK), offset)
+    if not data:
+        return 0
+    if hasher is not None:
+        hasher.update(data)
+    return write_at(dst_fd, data, dst_offset)
+
+
+def _hash_range(fd: int, offset: int, length: int, hasher):
+    end = offset + length
+    while offset < end:
+        data = read_at(fd, min(BUFFER_CHUNK, end - offset), offset)
+        if not data:
+            break
+        hasher.update(data)
+        offset += len(data)
+
+
+def read_at(fd: int, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def write_at(fd: int, data: bytes, offset: int) -> int:
+    """Write all of ``data`` at ``offset`` without moving other regions."""
+    written = 0
+    while written < len(data):
+        if hasattr(os, "pwrite"):
+            n = os.pwrite(fd, data[written:], offset + written)
+        else:
+            os.lseek(fd, offset + written, os.SEEK_SET)
+            n = os.write(fd, data[written:])
+        written += n
+    return written
+
+
+_STRATEGIES = []
+if hasattr(os, "copy_file_range"):
+    _STRATEGIES.append((COPY_FILE_RANGE, _copy_file_range, KERNEL_CHUNK))
+if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+    _STRATEGIES.append((SENDFILE, _sendfile, KERNEL_CHUNK))
+_STRATEGIES.append((BUFFERED, _buffered, BUFFER_CHUNK))
+
+
+def copy_range(src_fd: int, dst_fd: int, offset: int, length: int, dst_offset: int,
+               progress=None, cancelled=None, hasher=None) -> str:
+    """Copy ``length`` bytes from ``offset`` in src to ``dst_offset`` in dst.
+
+    ``progress(n)`` is called after each chunk; if ``cancelled()`` turns
+    true, CopyCancelled is raised. Returns the name of the strategy that
+    copied the bytes (the last one used, if several were needed). When the
+    result is BUFFERED, every copied byte has also been fed to ``hasher``
+    (if given); kernel-side copies never bring the data into Python.
+    """
+    used = BUFFERED
+    done = 0
+    for name, fn, chunk in _STRATEGIES:
+        used = name
+        if name == BUFFERED and hasher is not None:
+            # a kernel strategy may have copied a prefix before failing
+            _hash_range(src_fd, offset, done, hasher)
+            fn = functools.partial(_buffered, hasher=hasher)
+        try:
+            while done < length:
+                if cancelled and cancelled():
+                    raise CopyCancelled
+                n = fn(src_fd, dst_fd, offset + done, min(chunk, length - done),
+                       dst_offset + done)
+                if n <= 0:
+                    break
+                done += n
+                if progress:
+                    progress(n)
+            # A kernel copy stopping early is treated as unsupported; only
+            # the buffered loop hitting end of file means the source is short
+            if done == length or name == BUFFERED:
+                break
+        except OSError:
+            if name == BUFFERED:
+                raise
+            continue  # let the next strategy carry on from here
+    if done < length:
+        raise OSError(f"Short copy: {done} of {length} bytes")
+    return used
+
+
+def clone_or_copy(src_fd: int, dst_fd: int, length: int, progress=None,
+                  cancelled=None, hasher=None) -> str:
+    """Duplicate a whole file, preferring a reflink clone."""
+    if try_reflink(src_fd, dst_fd):
+        if progress:
+            progress(length)
+        return REFLINK
+    return copy_range(src_fd, dst_fd, 0, length, 0, progress, cancelled, hasher)
@@ -0,0 +1,228 @@
+"""Recursive folder import and watching.
+
+``iter_audio_files`` streams the audio files (any format ``formats``
+knows) in a directory tree. ``FolderWatcher`` then reports files that
+appear under the tree: through inotify on Linux, or by polling directory
+mtimes elsewhere (or when inotify runs out of watches).
+"""
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+from typing import Iterator
+
+import formats
+from source_files import iter_files
+
+AUDIO_EXTS = formats.supported_extensions()
+POLL_INTERVAL = 2.0
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def is_audio_file(name: str) -> bool:
+    return name.lower().endswith(AUDIO_EXTS)
+
+
+def iter_audio_files(root: str) -> Iterator[str]:
+    """Audio file paths under ``root`` in name order, one directory at a time."""
+    for entry in iter_files([root], ordered=True):
+        if is_audio_file(entry.name):
+            yield entry.path
+
+
+def _iter_dirs(root: str) -> Iterator[str]:
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        yield path
+        try:
+            with os.scandir(path) as it:
+                stack.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: dict[int, str] = {}
+
+    def add(self, path: str):
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self.dirs[wd] = path
+
+    def read(self, timeout: float) -> list[tuple[str, int]]:
+        """(path, mask) events, or an empty list after ``timeout``."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        buf = os.read(self.fd, 64 * 1024)
+        events = []
+        pos = 0
+        while pos < len(buf):
+            wd, mask, _, size = _EVENT.unpack_from(buf, pos)
+            pos += _EVENT.size
+            name = buf[pos:pos + size].rstrip(b"\0")
+            pos += size
+            if mask & IN_Q_OVERFLOW:
+                events.append(("", mask))
+            elif wd in self.dirs:
+                events.append((os.path.join(self.dirs[wd], os.fsdecode(name)), mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Reports audio files created under ``root`` after ``start()``.
+
+    Runs on a daemon thread; the UI drains new paths with ``poll()``. Files
+    are reported once they are complete: on close-after-write or rename
+    with inotify, or once their size has held steady for one interval when
+    polling. Polling only re-lists directories whose mtime changed and
+    keeps no state for settled files, so unlike inotify it doesn't notice
+    a file rewritten in place.
+    """
+
+    def __init__(self, root: str, interval: float = POLL_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.interval = interval
+        self.backend: str | None = None  # "inotify" or "polling"
+        self._paths: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def poll(self, limit: int = 1000) -> list[str]:
+        """Drain up to ``limit`` reported paths, without duplicates."""
+        paths = {}
+        for _ in range(limit):
+            try:
+                paths[self._paths.get_nowait()] = None
+            except queue.Empty:
+                break
+        return list(paths)
+
+    def _run(self):
+        if sys.platform.startswith("linux"):
+            try:
+                self._run_inotify()
+                return
+            except OSError:
+                pass  # no inotify or out of watches
+        self._run_polling()
+
+    def _run_inotify(self):
+        notify = _Inotify()
+        try:
+            for path in _iter_dirs(self.root):
+                notify.add(path)
+            self.backend = "inotify"
+            while not self._stop.is_set():
+                for path, mask in notify.read(0.5):
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were dropped: re-watch and re-report everything
+                        for d in _iter_dirs(self.root):
+                            notify.add(d)
+                        self._report_tree(self.root)
+                    elif mask & IN_ISDIR:
+                        # A new subtree may be populated before its watch exists
+                        for d in _iter_dirs(path):
+                            notify.add(d)
+                        self._report_tree(path)
+                    elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and is_audio_file(path):
+                        self._paths.put(path)
+        finally:
+            notify.close()
+
+    def _report_tree(self, root: str):
+        for path in iter_audio_files(root):
+            self._paths.put(path)
+
+    def _run_polling(self):
+        self.backend = "polling"
+        # directory -> (mtime_ns, newest audio file ctime_ns at the last listing)
+        dirs: dict[str, tuple[int, int]] = {}
+        unsettled: dict[str, tuple[int, int]] = {}  # new file -> (size, mtime_ns)
+
+        def scan_dir(path: str, report: bool):
+            """(Re)list ``path``, queueing audio files whose inode changed
+            (created or moved in) since it was last listed."""
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                since = dirs[path][1] if path in dirs else -1
+                newest = since
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.path not in dirs:
+                                scan_dir(entry.path, report)
+                        elif is_audio_file(entry.name) and entry.is_file():
+                            st = entry.stat()
+                            newest = max(newest, st.st_ctime_ns)
+                            if report and st.st_ctime_ns > since:
+                                unsettled[entry.path] = (st.st_size, st.st_mtime_ns)
+                dirs[path] = (mtime, newest)
+            except OSError:
+                dirs.pop(path, None)
+
+        for path in _iter_dirs(self.root):
+            if path not in dirs:
+                scan_dir(path, report=False)
+        while not self._stop.wait(self.interval):
+            # Files found in the last pass must hold steady for a whole interval
+            for path, sig in list(unsettled.items()):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    del unsettled[path]
+                    continue
+                now = (st.st_size, st.st_mtime_ns)
+                if now == sig:
+                    del unsettled[path]
+                    self._paths.put(path)
+                    # Its writes after the listing don't make it new again
+                    parent = os.path.dirname(path)
+                    if parent in dirs:
+                        mtime, newest = dirs[parent]
+                        dirs[parent] = (mtime, max(newest, st.st_ctime_ns))
+                else:
+                    unsettled[path] = now
+            # Only directories whose listing changed are re-read
+            for path, (mtime, _) in list(dirs.items()):
+                try:
+                    changed = os.stat(path).st_mtime_ns != mtime
+                except OSError:
+                    dirs.pop(path, None)
+                    continue
+                if changed:
+                    scan_dir(path, report=True)
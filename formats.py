@@ -0,0 +1,424 @@
+"""Audio format providers: MP3, WAV and FLAC.
+
+A provider recognises its files by their first bytes, reads title and
+duration from the headers alone (MPEG frames and ID3, RIFF fmt/data
+chunks, FLAC STREAMINFO and Vorbis comments) and writes the album tags
+into an exported copy. ``detect()`` picks the provider for a file;
+further formats are added with ``register()``. mutagen is only imported
+to write tags, or when a header can't be decided.
+"""
+import os
+import struct
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from mp3_header import (HEAD_READ, audio_start, id3v2_tag_size, id3v2_title,
+                        parse_frame_header, read_mp3_info, syncsafe)
+
+if TYPE_CHECKING:
+    from mutagen.id3 import ID3
+
+SNIFF_BYTES = 12
+TAG_READ = 256 * 1024  # most of a tag chunk/block worth reading for a title
+_APE_FOOTER = 32
+_APE_HAS_HEADER = 1 << 31
+
+
+def set_id3_album_frames(tags: "ID3", number: int, album_name: str, band_name: str,
+                         title: str):
+    from mutagen.id3 import TALB, TIT2, TPE1, TRCK
+
+    tags.setall("TRCK", [TRCK(encoding=3, text=str(number))])
+    tags.setall("TALB", [TALB(encoding=3, text=album_name)])
+    if band_name.strip():
+        tags.setall("TPE1", [TPE1(encoding=3, text=band_name)])
+    tags.setall("TIT2", [TIT2(encoding=3, text=title)])
+
+
+def _strip_trailing_tags(buf, start: int, end: int) -> int:
+    """End of the audio once ID3v1, APEv2 and appended ID3v2 tags are cut."""
+    while end - start >= 10:
+        if end - start >= 128 and buf[end - 128:end - 125] == b"TAG":
+            end -= 128  # ID3v1
+        elif end - start >= _APE_FOOTER and buf[end - _APE_FOOTER:end - 24] == b"APETAGEX":
+            footer = buf[end - _APE_FOOTER:end]
+            (size,) = struct.unpack_from("<I", footer, 12)  # items + footer
+            (flags,) = struct.unpack_from("<I", footer, 20)
+            if flags & _APE_HAS_HEADER:
+                size += _APE_FOOTER
+            end = max(start, end - size)
+        elif buf[end - 10:end - 7] == b"3DI":  # ID3v2.4 appended tag footer
+            end = max(start, end - syncsafe(buf[end - 4:end]) - 20)
+        else:
+            break
+    return end
+
+
+def _skip_id3v2(buf) -> int:
+    start = 0
+    while True:
+        size = id3v2_tag_size(buf[start:start + 10])
+        if not size or start + size > len(buf):
+            return start
+        start += size
+
+
+class FormatProvider(ABC):
+    """One audio format. Subclasses set ``name`` and ``extensions`` (the
+    first is used for exported files) and implement the abstract methods."""
+
+    name = ""
+    extensions: tuple[str, ...] = ()
+    # Export can write a new tag and the source audio in one pass
+    # (album_service's "stream" mode); otherwise it copies, then tags.
+    streamable = False
+
+    @abstractmethod
+    def matches(self, head: bytes) -> bool:
+        ...
+
+    @abstractmethod
+    def probe(self, path: str) -> dict | None:
+        """Title and duration from the headers, or None if undecidable."""
+        ...
+
+    def probe_full(self, path: str) -> dict:
+        """Title and duration through mutagen, for files ``probe`` can't decide."""
+        import mutagen
+
+        title, duration = None, 0.0
+        try:
+            f = mutagen.File(path)
+        except Exception:
+            f = None
+        if f is not None:
+            duration = getattr(f.info, "length", 0.0) or 0.0
+            title = _mutagen_title(f.tags)
+        return {"title": title, "duration_secs": duration}
+
+    @abstractmethod
+    def stream_format(self, path: str) -> tuple[int, int] | None:
+        """(sample rate, channels), or None if not found."""
+        ...
+
+    @abstractmethod
+    def audio_region(self, buf) -> tuple[int, int]:
+        """(start, end) of the audio data in the whole-file buffer ``buf``."""
+        ...
+
+    @abstractmethod
+    def write_tags(self, path, number: int, album_name: str, band_name: str, title: str):
+        """Set track number, album, artist and title in the file at ``path``."""
+        ...
+
+
+def _mutagen_title(tags) -> str | None:
+    if tags is None:
+        return None
+    for key in ("TIT2", "title", "TITLE"):
+        try:
+            value = tags.get(key)
+        except (KeyError, ValueError):
+            continue
+        if value:
+            text = str(value[0] if isinstance(value, list) else value)
+            return text or None
+    return None
+
+
+class MP3Format(FormatProvider):
+    name = "mp3"
+    extensions = (".mp3",)
+    streamable = True
+
+    def matches(self, head: bytes) -> bool:
+        return head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF
+                                      and head[1] & 0xE0 == 0xE0)
+
+    def probe(self, path: str) -> dict | None:
+        return read_mp3_info(path)
+
+    def probe_full(self, path: str) -> dict:
+        from mutagen.id3 import ID3
+        from mutagen.mp3 import MP3
+
+        title = None
+        duration = 0.0
+        try:
+            mp3 = MP3(path)
+            duration = mp3.info.length
+        except Exception:
+            pass
+        try:
+            tags = ID3(path)
+            tit2 = tags.get("TIT2")
+            if tit2 and str(tit2):
+                title = str(tit2)
+        except Exception:
+            pass
+        return {"title": title, "duration_secs": duration}
+
+    def stream_format(self, path: str) -> tuple[int, int] | None:
+        """From the first MPEG frame header that is followed by another."""
+        with open(path, "rb") as f:
+            buf = f.read(HEAD_READ)
+        start = audio_start(buf)
+        if start >= len(buf):
+            with open(path, "rb") as f:
+                f.seek(start)
+                buf, start = f.read(HEAD_READ), 0
+        pos = buf.find(b"\xff", start)
+        while pos != -1:
+            frame = parse_frame_header(buf, pos)
+            if frame and parse_frame_header(buf, pos + frame.length):
+                return frame.sample_rate, 1 if frame.mode == 3 else 2
+            pos = buf.find(b"\xff", pos + 1)
+        return None
+
+    def audio_region(self, buf) -> tuple[int, int]:
+        start = _skip_id3v2(buf)
+        return start, _strip_trailing_tags(buf, start, len(buf))
+
+    def write_tags(self, path, number: int, album_name: str, band_name: str, title: str):
+        from mutagen.id3 import ID3, ID3NoHeaderError
+
+        try:
+            tags = ID3(path)
+        except ID3NoHeaderError:
+            tags = ID3()
+        set_id3_album_frames(tags, number, album_name, band_name, title)
+        tags.save(path)
+
+
+class WAVFormat(FormatProvider):
+    name = "wav"
+    extensions = (".wav", ".wave")
+
+    def matches(self, head: bytes) -> bool:
+        return head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+    @staticmethod
+    def _chunks(read_at, size: int):
+        """Yield (id, body offset, body length) of the top-level RIFF chunks."""
+        pos = 12
+        while pos + 8 <= size:
+            header = read_at(pos, 8)
+            if len(header) < 8:
+                return
+            chunk_id, length = header[:4], struct.unpack_from("<I", header, 4)[0]
+            body = pos + 8
+            length = min(length, size - body)  # streamed files may leave it unset
+            yield chunk_id, body, length
+            pos = body + length + (length & 1)
+
+    def _parse(self, read_at, size: int) -> dict | None:
+        info: dict = {"title": None}
+        info_title = None
+        for chunk_id, body, length in self._chunks(read_at, size):
+            if chunk_id == b"fmt " and length >= 16:
+                channels, rate, byte_rate = struct.unpack_from("<HII", read_at(body + 2, 10))
+                info.update(channels=channels, rate=rate, byte_rate=byte_rate)
+            elif chunk_id == b"data":
+                info["data"] = (body, body + length)
+            elif chunk_id in (b"id3 ", b"ID3 "):
+                info["title"] = id3v2_title(read_at(body, min(length, TAG_READ)))
+            elif chunk_id == b"LIST" and length >= 4 and read_at(body, 4) == b"INFO":
+                info_title = self._info_title(read_at(body + 4, min(length - 4, TAG_READ)))
+        if "rate" not in info or "data" not in info:
+            return None
+        info["title"] = info["title"] or info_title
+        return info
+
+    @staticmethod
+    def _info_title(buf: bytes) -> str | None:
+        pos = 0
+        while pos + 8 <= len(buf):
+            sub_id, length = buf[pos:pos + 4], struct.unpack_from("<I", buf, pos + 4)[0]
+            if sub_id == b"INAM":
+                text = buf[pos + 8:pos + 8 + length].split(b"\0")[0]
+                return text.decode("utf-8", "replace").strip() or None
+            pos += 8 + length + (length & 1)
+        return None
+
+    def _parse_file(self, path: str) -> dict | None:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+
+            def read_at(offset, n):
+                f.seek(offset)
+                return f.read(n)
+
+            if not self.matches(read_at(0, SNIFF_BYTES)):
+                return None
+            return self._parse(read_at, size)
+
+    def probe(self, path: str) -> dict | None:
+        info = self._parse_file(path)
+        if info is None or not info["byte_rate"]:
+            return None
+        start, end = info["data"]
+        return {"title": info["title"], "duration_secs": (end - start) / info["byte_rate"]}
+
+    def stream_format(self, path: str) -> tuple[int, int] | None:
+        info = self._parse_file(path)
+        return (info["rate"], info["channels"]) if info else None
+
+    def audio_region(self, buf) -> tuple[int, int]:
+        info = self._parse(lambda offset, n: buf[offset:offset + n], len(buf))
+        return info["data"] if info else (0, len(buf))
+
+    def write_tags(self, path, number: int, album_name: str, band_name: str, title: str):
+        from mutagen.wave import WAVE
+
+        wav = WAVE(path)
+        if wav.tags is None:
+            wav.add_tags()
+        set_id3_album_frames(wav.tags, number, album_name, band_name, title)
+        wav.save()
+
+
+class FLACFormat(FormatProvider):
+    name = "flac"
+    extensions = (".flac",)
+
+    STREAMINFO = 0
+    VORBIS_COMMENT = 4
+
+    def matches(self, head: bytes) -> bool:
+        return head[:4] == b"fLaC"
+
+    def _parse(self, read_at) -> dict | None:
+        """STREAMINFO, title and the offset of the first audio frame."""
+        pos = 0
+        while size := id3v2_tag_size(read_at(pos, 10)):
+            pos += size
+        if read_at(pos, 4) != b"fLaC":
+            return None
+        pos += 4
+        info: dict = {"title": None}
+        while True:
+            header = read_at(pos, 4)
+            if len(header) < 4:
+                return None
+            last, block_type = header[0] & 0x80, header[0] & 0x7F
+            length = int.from_bytes(header[1:4], "big")
+            body = pos + 4
+            if block_type == self.STREAMINFO:
+                b = read_at(body, 34)
+                if len(b) < 18:
+                    return None
+                info["rate"] = (b[10] << 12) | (b[11] << 4) | (b[12] >> 4)
+                info["channels"] = ((b[12] >> 1) & 0x07) + 1
+                info["samples"] = ((b[13] & 0x0F) << 32) | int.from_bytes(b[14:18], "big")
+            elif block_type == self.VORBIS_COMMENT:
+                info["title"] = self._comment_title(read_at(body, min(length, TAG_READ)))
+            pos = body + length
+            if last:
+                break
+        if not info.get("rate"):
+            return None
+        info["audio_start"] = pos
+        return info
+
+    @staticmethod
+    def _comment_title(buf: bytes) -> str | None:
+        try:
+            (vendor_len,) = struct.unpack_from("<I", buf, 0)
+            pos = 4 + vendor_len
+            (count,) = struct.unpack_from("<I", buf, pos)
+            pos += 4
+            for _ in range(count):
+                (length,) = struct.unpack_from("<I", buf, pos)
+                key, _, value = buf[pos + 4:pos + 4 + length].partition(b"=")
+                if key.upper() == b"TITLE":
+                    return value.decode("utf-8", "replace") or None
+                pos += 4 + length
+        except struct.error:
+            pass
+        return None
+
+    def _parse_file(self, path: str) -> dict | None:
+        with open(path, "rb") as f:
+            def read_at(offset, n):
+                f.seek(offset)
+                return f.read(n)
+
+            return self._parse(read_at)
+
+    def probe(self, path: str) -> dict | None:
+        info = self._parse_file(path)
+        if info is None or not info["samples"]:
+            return None  # unknown length: let mutagen decide
+        return {"title": info["title"], "duration_secs": info["samples"] / info["rate"]}
+
+    def stream_format(self, path: str) -> tuple[int, int] | None:
+        info = self._parse_file(path)
+        return (info["rate"], info["channels"]) if info else None
+
+    def audio_region(self, buf) -> tuple[int, int]:
+        info = self._parse(lambda offset, n: buf[offset:offset + n])
+        start = info["audio_start"] if info else 0
+        return start, _strip_trailing_tags(buf, start, len(buf))
+
+    def write_tags(self, path, number: int, album_name: str, band_name: str, title: str):
+        from mutagen.flac import FLAC
+
+        flac = FLAC(path)
+        if flac.tags is None:
+            flac.add_tags()
+        flac["TRACKNUMBER"] = str(number)
+        flac["ALBUM"] = album_name
+        if band_name.strip():
+            flac["ARTIST"] = band_name
+        flac["TITLE"] = title
+        flac.save()
+
+
+MP3 = MP3Format()
+_providers: list[FormatProvider] = []
+
+
+def register(provider: FormatProvider):
+    """Add a provider; later registrations are tried first."""
+    _providers.insert(0, provider)
+
+
+for _provider in (MP3, WAVFormat(), FLACFormat()):
+    register(_provider)
+
+
+def supported_extensions() -> tuple[str, ...]:
+    return tuple(ext for p in _providers for ext in p.extensions)
+
+
+def by_extension(path: str) -> FormatProvider | None:
+    suffix = Path(path).suffix.lower()
+    return next((p for p in _providers if suffix in p.extensions), None)
+
+
+def sniff(head: bytes) -> FormatProvider | None:
+    return next((p for p in _providers if p.matches(head)), None)
+
+
+def detect(path: str) -> FormatProvider | None:
+    """The provider for ``path`` by its magic bytes (looking past a leading
+    ID3v2 tag, which some FLAC and WAV files carry), falling back to the
+    extension. None if unreadable or unknown."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            tag = id3v2_tag_size(head[:10])
+            if tag:
+                f.seek(tag)
+                provider = sniff(f.read(SNIFF_BYTES))
+                if provider is not None:
+                    return provider
+    except OSError:
+        return None
+    return sniff(head) or by_extension(path)
+
+
+def provider_for(path: str) -> FormatProvider:
+    """``detect(path)``, defaulting to MP3 for files that can't be sniffed."""
+    return detect(path) or by_extension(path) or MP3
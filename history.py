@@ -0,0 +1,137 @@
+"""Undo/redo history kept as operation deltas rather than snapshots.
+
+An operation is a small tuple:
+
+    ("insert", index, tracks)      tracks were inserted at index
+    ("remove", indices, tracks)    tracks were removed from (ascending) indices
+    ("reinsert", indices, tracks)  the undo of a scattered remove
+    ("move", src, dst)             one track moved from src to dst
+    ("field", name, old, new)      an album field changed
+
+Tracks are referenced, not copied, and a drag is stored in nine bytes,
+so thousands of steps cost kilobytes; undoing or redoing an entry applies
+only that change.
+"""
+from array import array
+
+HISTORY_LIMIT = 5000  # undoable entries kept
+_MOVE, _ENTRY = 0, 1
+
+
+def inverse(op: tuple) -> tuple:
+    kind = op[0]
+    if kind == "insert":
+        _, index, tracks = op
+        return ("remove", tuple(range(index, index + len(tracks))), tracks)
+    if kind == "remove":
+        _, indices, tracks = op
+        if indices and indices[-1] - indices[0] == len(indices) - 1:
+            return ("insert", indices[0], tracks)  # one contiguous run
+        return ("reinsert", indices, tracks)
+    if kind == "reinsert":
+        return ("remove",) + op[1:]
+    if kind == "move":
+        return ("move", op[2], op[1])
+    if kind == "field":
+        return ("field", op[1], op[3], op[2])
+    raise ValueError(f"unknown history operation {kind!r}")
+
+
+class History:
+    """Undo and redo stacks of entries, each a tuple of operations.
+
+    ``record()`` adds an operation as a new entry, or to the last entry
+    when ``merge`` matches the previous call (one import, one field being
+    typed into). Recording is ignored while ``paused`` is set, which the
+    owner does while applying an undo or redo.
+
+    Single moves, by far the most common entry, are packed into one
+    machine word each instead of a tuple.
+    """
+
+    def __init__(self, limit: int = HISTORY_LIMIT):
+        self.limit = limit
+        # Undo entries oldest first: one byte per entry in _kinds, saying
+        # whether it is a packed move in _moves or a tuple in _entries.
+        self._kinds = bytearray()
+        self._moves = array("Q")
+        self._entries: list[tuple] = []
+        self._redo: list[tuple] = []
+        self._merge = None
+        self.paused = False
+
+    def record(self, op: tuple, merge=None):
+        if self.paused:
+            return
+        self._redo.clear()
+        if merge is not None and merge == self._merge and self._kinds \
+                and self._kinds[-1] == _ENTRY:
+            last = self._entries[-1]
+            if op[0] == "field" and last[-1][0] == "field":
+                op = ("field", op[1], last[-1][2], op[3])  # keep the oldest value
+                last = last[:-1]
+            self._entries[-1] = last + (op,)
+        else:
+            self._push((op,))
+        self._merge = merge
+
+    def _push(self, entry: tuple):
+        if len(entry) == 1 and entry[0][0] == "move":
+            _, src, dst = entry[0]
+            self._kinds.append(_MOVE)
+            self._moves.append(src << 32 | dst)
+        else:
+            self._kinds.append(_ENTRY)
+            self._entries.append(entry)
+        if len(self._kinds) > self.limit + self.limit // 4:
+            # drop the oldest entries in one go rather than one per record
+            drop = len(self._kinds) - self.limit
+            moves = self._kinds.count(_MOVE, 0, drop)
+            del self._kinds[:drop]
+            del self._moves[:moves]
+            del self._entries[:drop - moves]
+
+    def _pop(self) -> tuple:
+        if self._kinds.pop() == _MOVE:
+            packed = self._moves.pop()
+            return (("move", packed >> 32, packed & 0xFFFFFFFF),)
+        return self._entries.pop()
+
+    def break_merge(self):
+        self._merge = None
+
+    def clear(self):
+        self._kinds.clear()
+        del self._moves[:]
+        self._entries.clear()
+        self._redo.clear()
+        self._merge = None
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._kinds)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> list[tuple]:
+        """Operations that revert the last entry, in the order to apply them."""
+        if not self._kinds:
+            return []
+        entry = self._pop()
+        self._redo.append(entry)
+        self._merge = None
+        return [inverse(op) for op in reversed(entry)]
+
+    def redo(self) -> list[tuple]:
+        """Operations that reapply the last undone entry."""
+        if not self._redo:
+            return []
+        entry = self._redo.pop()
+        self._push(entry)
+        self._merge = None
+        return list(entry)
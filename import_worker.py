@@ -0,0 +1,213 @@
+import itertools
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import formats
+from audio_hash import cached_audio_hash
+from metadata_cache import default_cache
+from models import Track
+
+
+def _load_track(path: str, exact: bool = False) -> Track:
+    if not Path(path).exists():
+        raise FileNotFoundError("File not found")
+    if formats.detect(path) is None:
+        raise ValueError("Unsupported audio format")
+    return Track.from_file(path, exact=exact)
+
+
+class ImportJob:
+    """Reads track metadata on a worker pool, off the Tk thread.
+
+    Results are handed back in the original order through ``poll()``, which
+    the UI calls from ``after()`` so rows can be inserted in batches.
+    ``paths`` may be a lazy iterator (e.g. a directory walk); it is consumed
+    with a bounded number of files in flight and ``total`` grows as paths
+    are discovered.
+
+    With ``duplicates`` ("flag" or "skip") the audio of every file is hashed
+    too, and files whose audio matches an earlier one, or one of
+    ``existing`` (path -> hash, or None if not known yet), are listed in
+    ``duplicates_found``; "skip" also leaves them out of ``poll()``. In
+    "flag" mode existing tracks are hashed on the pool alongside the new
+    files, so rows appear at once and a match with an existing track may be
+    found a few polls after the new file was returned; "skip" has to hash
+    them before any file is admitted.
+    """
+
+    def __init__(self, paths, max_workers: int | None = None, exact: bool = False,
+                 duplicates: str | None = None, existing: dict[str, str | None] | None = None):
+        self.streaming = not hasattr(paths, "__len__")
+        self.paths = (p.strip().strip("{}") for p in paths)
+        self.exact = exact
+        self.total = 0 if self.streaming else len(paths)
+        self.completed = 0
+        self.errors: list[tuple[str, str]] = []  # (filename, message)
+        self.duplicates = duplicates
+        self.existing = existing or {}
+        self.hashes: dict[str, str] = {}  # source path -> audio hash
+        self.duplicates_found: list[tuple[Track, str]] = []  # (track, path it duplicates)
+        self._seen: dict[str, str] = {}  # audio hash -> first path with it
+        self._first_new: dict[str, Track] = {}  # audio hash -> first new track with it
+        self._hashed: queue.Queue = queue.Queue()  # (existing path, hash)
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) + 4)
+        self._results: queue.Queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set() and self._results.empty() and self._hashed.empty()
+
+    def _run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                unhashed = self._hash_existing(pool) if self.duplicates else iter(())
+                window = self.max_workers * 4
+                in_flight: deque = deque()
+                hashing: deque = deque()
+                for path in self.paths:
+                    if self._cancel.is_set():
+                        break
+                    if self.streaming:
+                        self.total += 1
+                    in_flight.append((path, pool.submit(self._work, path)))
+                    # One existing track per new file, so they don't hold up the rows
+                    for existing in itertools.islice(unhashed, 1):
+                        hashing.append((existing, pool.submit(self._hash, existing)))
+                    if len(in_flight) >= window:
+                        self._deliver(*in_flight.popleft())
+                    while hashing and hashing[0][1].done():
+                        self._deliver_hash(*hashing.popleft())
+                if not self._cancel.is_set():
+                    hashing.extend((p, pool.submit(self._hash, p)) for p in unhashed)
+                while in_flight and not self._cancel.is_set():
+                    self._deliver(*in_flight.popleft())
+                while hashing and not self._cancel.is_set():
+                    self._deliver_hash(*hashing.popleft())
+                for _, fut in (*in_flight, *hashing):
+                    fut.cancel()
+        finally:
+            default_cache().flush()
+            self._done.set()
+
+    def _deliver(self, path: str, fut):
+        try:
+            self._results.put((path, fut.result(), None))
+        except Exception as e:
+            self._results.put((path, None, e))
+
+    def _deliver_hash(self, path: str, fut):
+        try:
+            self._hashed.put((path, fut.result()))
+        except Exception:
+            pass  # unreadable now; it just can't be matched
+
+    def _hash_existing(self, pool):
+        """Note the known hashes of ``existing``; returns an iterator over the
+        paths still to hash (empty in "skip" mode, which hashes them here)."""
+        unknown = [p for p, digest in self.existing.items() if digest is None]
+        if self.duplicates == "skip":
+            for path, digest in zip(unknown, pool.map(self._hash, unknown)):
+                if digest:
+                    self.hashes[path] = digest
+            unknown = []
+        for path, digest in self.existing.items():
+            digest = digest or self.hashes.get(path)
+            if digest:
+                self._seen.setdefault(digest, path)
+        return iter(unknown)
+
+    def _hash(self, path: str) -> str | None:
+        return cached_audio_hash(path, default_cache())
+
+    def _add_existing(self, path: str, digest: str | None):
+        """Take in the late hash of an existing track, flagging the new track
+        that was taken as the first with that audio."""
+        if not digest:
+            return
+        self.hashes[path] = digest
+        track = self._first_new.pop(digest, None)
+        if track is not None:
+            self.duplicates_found.append((track, path))
+            self._seen[digest] = path
+        else:
+            self._seen.setdefault(digest, path)
+
+    def _work(self, path: str) -> Track | None:
+        if self._cancel.is_set():
+            return None
+        track = _load_track(path, self.exact)
+        if self.duplicates:
+            digest = self._hash(track.source_path)
+            if digest:
+                self.hashes[track.source_path] = digest
+        return track
+
+    def wait(self) -> list[Track]:
+        """Block until finished (for headless use); returns all remaining tracks."""
+        self._thread.join()
+        return self.poll(limit=self._results.qsize())
+
+    def poll(self, limit: int = 200) -> list[Track]:
+        """Drain up to ``limit`` finished results; returns the new tracks."""
+        while True:
+            try:
+                self._add_existing(*self._hashed.get_nowait())
+            except queue.Empty:
+                break
+        tracks = []
+        for _ in range(limit):
+            try:
+                path, track, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.completed += 1
+            if error is not None:
+                self.errors.append((Path(path).name, str(error) or type(error).__name__))
+            elif track is not None and not self._cancel.is_set():
+                if self.duplicates and self._is_duplicate(track):
+                    if self.duplicates == "skip":
+                        continue
+                tracks.append(track)
+        return tracks
+
+    def _is_duplicate(self, track: Track) -> bool:
+        digest = self.hashes.get(track.source_path)
+        if digest is None:
+            return False
+        first = self._seen.get(digest)
+        if first is None:
+            self._seen[digest] = track.source_path
+            self._first_new[digest] = track
+            return False
+        self.duplicates_found.append((track, first))
+        return True
+
+    def duplicate_report(self, max_lines: int = 20) -> str:
+        lines = [f"{track.original_filename}: same audio as {Path(first).name}"
+                 for track, first in self.duplicates_found[:max_lines]]
+        if len(self.duplicates_found) > max_lines:
+            lines.append(f"...and {len(self.duplicates_found) - max_lines} more")
+        return "\n".join(lines)
+
+    def error_report(self, max_lines: int = 20) -> str:
+        lines = [f"{name}: {msg}" for name, msg in self.errors[:max_lines]]
+        if len(self.errors) > max_lines:
+            lines.append(f"...and {len(self.errors) - max_lines} more")
+        return "\n".join(lines)
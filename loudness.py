@@ -0,0 +1,282 @@
+"""Integrated loudness (ITU-R BS.1770-4 / EBU R128) and true peak per track.
+
+Needs NumPy, SciPy and the ffmpeg executable on PATH; without them
+``available`` is false and the UI disables the analysis.
+
+Tracks are decoded by ffmpeg to 32-bit float PCM and processed in chunks,
+so memory stays constant whatever the track length: the K-weighting
+filter state is carried between chunks and only one mean square per
+100 ms step is kept for gating. Files are analysed in a process pool and
+results are stored in the metadata cache next to title and duration, so
+only new or changed files are decoded again.
+"""
+import importlib.util
+import math
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import formats
+from metadata_cache import default_cache
+from models import read_metadata
+
+FFMPEG = shutil.which("ffmpeg")
+# NumPy and SciPy take most of a second to import, so they load on first use
+np = None
+signal = None
+available = (FFMPEG is not None and importlib.util.find_spec("numpy") is not None
+             and importlib.util.find_spec("scipy") is not None)
+
+CHUNK_FRAMES = 1 << 18  # PCM frames decoded per chunk
+STEP_SECS = 0.1  # gating blocks are 400 ms long and start every 100 ms
+BLOCK_STEPS = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+OVERSAMPLE = 4  # true peak is measured on 4x oversampled audio
+PEAK_MARGIN = 16  # input samples at chunk edges skewed by the resampler's padding
+
+FIELDS = ("lufs", "true_peak_db")
+
+
+def _load_numeric():
+    global np, signal
+    if signal is None:
+        import numpy
+        from scipy import signal as scipy_signal
+        np, signal = numpy, scipy_signal
+
+
+def k_weighting(rate: int):
+    """(b, a) of the two-stage K-weighting filter for ``rate`` Hz."""
+    _load_numeric()
+    # Pre-filter (high shelf), as designed by libebur128
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0,
+               (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    # RLB high-pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1 + k / q + k * k
+    hp_b = [1.0, -2.0, 1.0]
+    hp_a = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return np.convolve(shelf_b, hp_b), np.convolve(shelf_a, hp_a)
+
+
+class LoudnessMeter:
+    """Streaming BS.1770 meter: feed float samples shaped (frames, channels)."""
+
+    def __init__(self, rate: int, channels: int):
+        _load_numeric()
+        self.rate = rate
+        self.channels = channels
+        self._b, self._a = k_weighting(rate)
+        self._zi = np.zeros((len(self._a) - 1, channels))
+        self._step = int(round(rate * STEP_SECS))
+        self._partial = np.zeros(channels)  # sum of squares of the unfinished step
+        self._partial_n = 0
+        self._steps: list = []  # per step: mean square summed over channels
+        self._peak = 0.0
+        self._sample_peak = 0.0
+        self._tail = np.zeros((0, channels))
+
+    def feed(self, samples):
+        if not len(samples):
+            return
+        self._sample_peak = max(self._sample_peak, float(np.abs(samples).max()))
+        self._feed_peak(samples)
+        filtered, self._zi = signal.lfilter(self._b, self._a, samples, axis=0, zi=self._zi)
+        squares = filtered * filtered
+        pos = 0
+        if self._partial_n:
+            take = min(self._step - self._partial_n, len(squares))
+            self._partial += squares[:take].sum(axis=0)
+            self._partial_n += take
+            pos = take
+            if self._partial_n < self._step:
+                return
+            self._steps.append(float(self._partial.sum()) / self._step)
+            self._partial[:] = 0
+            self._partial_n = 0
+        whole = (len(squares) - pos) // self._step
+        if whole:
+            block = squares[pos:pos + whole * self._step]
+            sums = block.reshape(whole, self._step, self.channels).sum(axis=(1, 2))
+            self._steps.extend((sums / self._step).tolist())
+            pos += whole * self._step
+        if pos < len(squares):
+            self._partial = squares[pos:].sum(axis=0)
+            self._partial_n = len(squares) - pos
+
+    def _feed_peak(self, samples):
+        # Chunks overlap so that only the interior of each oversampled chunk,
+        # away from the zero padding, is measured, and nothing is skipped
+        data = np.concatenate([self._tail, samples]) if len(self._tail) else samples
+        if len(data) <= 2 * PEAK_MARGIN:
+            self._tail = data
+            return
+        upsampled = signal.resample_poly(data, OVERSAMPLE, 1, axis=0)
+        inner = upsampled[PEAK_MARGIN * OVERSAMPLE:(len(data) - PEAK_MARGIN) * OVERSAMPLE]
+        self._peak = max(self._peak, float(np.abs(inner).max()))
+        self._tail = data[-2 * PEAK_MARGIN:]
+
+    def integrated(self) -> float | None:
+        """Gated integrated loudness in LUFS, or None for silence."""
+        steps = np.asarray(self._steps)
+        if len(steps) < BLOCK_STEPS:
+            if not len(steps):
+                return None
+            blocks = np.array([steps.mean()])
+        else:
+            # Mean of 4 consecutive steps = one 400 ms block with 75% overlap
+            window = np.lib.stride_tricks.sliding_window_view(steps, BLOCK_STEPS)
+            blocks = window.mean(axis=1)
+        with np.errstate(divide="ignore"):
+            levels = -0.691 + 10 * np.log10(blocks)
+        gated = blocks[levels > ABSOLUTE_GATE]
+        if not len(gated):
+            return None
+        threshold = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE
+        with np.errstate(divide="ignore"):
+            gated = gated[-0.691 + 10 * np.log10(gated) > threshold]
+        return -0.691 + 10 * math.log10(gated.mean())
+
+    def true_peak_db(self) -> float | None:
+        peak = max(self._peak, self._sample_peak)
+        return 20 * math.log10(peak) if peak > 0 else None
+
+
+def stream_format(path: str) -> tuple[int, int] | None:
+    """(sample rate, channels) from the file headers."""
+    provider = formats.detect(path)
+    return provider.stream_format(path) if provider else None
+
+
+def decode_chunks(path: str, rate: int, channels: int):
+    """Yield float32 PCM chunks shaped (frames, channels) decoded by ffmpeg."""
+    _load_numeric()
+    cmd = [FFMPEG, "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0",
+           "-f", "f32le", "-acodec", "pcm_f32le", "-ar", str(rate), "-ac", str(channels), "-"]
+    chunk_bytes = CHUNK_FRAMES * channels * 4
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        leftover = b""
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % (channels * 4)
+            leftover = data[usable:]
+            yield np.frombuffer(data[:usable], dtype="<f4").reshape(-1, channels)
+        if proc.wait() != 0:
+            raise OSError(f"ffmpeg could not decode {os.path.basename(path)}")
+
+
+def analyze_file(path: str) -> dict:
+    """Integrated loudness and true peak of one file (run in a worker process)."""
+    fmt = stream_format(path)
+    if fmt is None:
+        raise ValueError("No supported audio found")
+    meter = LoudnessMeter(*fmt)
+    for chunk in decode_chunks(path, *fmt):
+        meter.feed(chunk.astype(np.float64))
+    return {"lufs": meter.integrated(), "true_peak_db": meter.true_peak_db()}
+
+
+class LoudnessJob:
+    """Analyses files in a process pool, off the Tk thread.
+
+    Results already in the metadata cache for the file's current size and
+    mtime are returned without decoding. ``poll()`` hands back
+    (path, fields) pairs as they finish.
+    """
+
+    def __init__(self, paths, max_workers: int | None = None):
+        self.paths = list(dict.fromkeys(paths))
+        self.total = len(self.paths)
+        self.completed = 0
+        self.errors: list[tuple[str, str]] = []  # (filename, message)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._results: queue.Queue = queue.Queue()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set() and self._results.empty()
+
+    def _run(self):
+        cache = default_cache()
+        try:
+            todo = []
+            for path in self.paths:
+                if self._cancel.is_set():
+                    return
+                try:
+                    st = os.stat(path)
+                except OSError as e:
+                    self._results.put((path, None, e))
+                    continue
+                fields = cache.get(path, st)
+                if fields and all(f in fields for f in FIELDS):
+                    self._results.put((path, {f: fields[f] for f in FIELDS}, None))
+                else:
+                    todo.append((path, st))
+            if not todo:
+                return
+            # Spawned workers never inherit the Tk process state
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(todo)),
+                                     mp_context=ctx) as pool:
+                futures = {pool.submit(analyze_file, path): (path, st) for path, st in todo}
+                for fut in as_completed(futures):
+                    if self._cancel.is_set():
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        return
+                    path, st = futures[fut]
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        self._results.put((path, None, e))
+                        continue
+                    cache.extend(path, st, result, lambda: read_metadata(path))
+                    self._results.put((path, result, None))
+        finally:
+            cache.flush()
+            self._done.set()
+
+    def poll(self, limit: int = 200) -> list[tuple[str, dict]]:
+        """Drain up to ``limit`` finished results."""
+        results = []
+        for _ in range(limit):
+            try:
+                path, fields, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.completed += 1
+            if error is not None:
+                self.errors.append((os.path.basename(path), str(error) or type(error).__name__))
+            elif not self._cancel.is_set():
+                results.append((path, fields))
+        return results
+
+    def error_report(self, max_lines: int = 20) -> str:
+        lines = [f"{name}: {msg}" for name, msg in self.errors[:max_lines]]
+        if len(self.errors) > max_lines:
+            lines.append(f"...and {len(self.errors) - max_lines} more")
+        return "\n".join(lines)
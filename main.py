@@ -1,7 +1,18 @@
 #!/usr/bin/env python3
-import tkinter as tk
 import sys
 
+import startup
+import tracing
+
+if startup.requested():
+    startup.enable()
+trace_path = tracing.requested()
+if trace_path:
+    tracing.enable(trace_path)
+
+import tkinter as tk
+
+
 def main():
     try:
         from tkinterdnd2 import TkinterDnD
@@ -9,6 +20,7 @@ def main():
     except ImportError:
         print("tkinterdnd2 not available, drag-and-drop from file manager disabled")
         root = tk.Tk()
+    startup.mark("Tk root created")
 
     root.title("Album Planner")
     root.geometry("900x600")
@@ -16,10 +28,18 @@ def main():
 
     from theme import apply_theme
     apply_theme(root)
+    # Show the (empty) window before the rest of the app is imported
+    root.update()
+    startup.mark("window shown")
 
     from app import App
+    startup.mark("app modules imported")
     App(root)
+    startup.mark("UI built")
+    tracing.watch_event_loop(root)
 
+    if startup.enabled:
+        root.after_idle(lambda: (startup.mark("first idle"), startup.report()))
     root.mainloop()
 
 
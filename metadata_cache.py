@@ -0,0 +1,173 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_MAX_ENTRIES = 50_000
+# Bump when the metadata readers change what they extract; older entries are dropped
+CACHE_VERSION = 2
+
+
+def user_cache_dir() -> Path:
+    """Per-user cache directory for Album Planner."""
+    override = os.environ.get("ALBUMPLANNER_CACHE_DIR")
+    if override:
+        return Path(override)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "albumplanner"
+
+
+class MetadataCache:
+    """SQLite cache of extracted track fields, keyed by path, size and mtime.
+
+    An entry is only returned while the file's size and mtime still match
+    what was stored, so edited files are re-read automatically. The least
+    recently used entries are evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, db_path: str | Path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}
+        self._puts_since_evict = 0
+        try:
+            if str(db_path) != ":memory:":
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        except (OSError, sqlite3.Error):
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+
+    def get(self, path: str, st: os.stat_result) -> dict | None:
+        """Cached fields for ``path`` if its size and mtime are unchanged."""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT size, mtime_ns, data FROM entries WHERE path = ?", (path,)
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                return None
+            if row[0] != st.st_size or row[1] != st.st_mtime_ns:
+                return None
+            self._touched[path] = time.time()
+            return json.loads(row[2])
+
+    def put(self, path: str, st: os.stat_result, fields: dict):
+        """Store ``fields`` for ``path``, replacing any stale entry."""
+        self.update(path, st, fields, merge=False)
+
+    def update(self, path: str, st: os.stat_result, fields: dict, merge: bool = True):
+        """Merge ``fields`` into the entry for ``path`` (dropping it if stale)."""
+        with self._lock:
+            try:
+                data = {}
+                if merge:
+                    row = self._conn.execute(
+                        "SELECT size, mtime_ns, data FROM entries WHERE path = ?", (path,)
+                    ).fetchone()
+                    if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                        data = json.loads(row[2])
+                data.update(fields)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (path, size, mtime_ns, data, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (path, st.st_size, st.st_mtime_ns, json.dumps(data), time.time()),
+                )
+                self._touched.pop(path, None)
+                self._puts_since_evict += 1
+                if self._puts_since_evict >= 500:
+                    self._evict()
+                self._flush_touched()
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def extend(self, path: str, st: os.stat_result, fields: dict, base):
+        """Add extra ``fields`` (a hash, loudness) to the entry for ``path``.
+
+        Without a current entry one is created from ``base()``, the title
+        and duration fields, so that entries are always complete.
+        """
+        if self.get(path, st) is None:
+            fields = {**base(), **fields}
+        self.update(path, st, fields)
+
+    def invalidate(self, path: str):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute("DELETE FROM entries WHERE path = ?", (path,))
+            except sqlite3.Error:
+                pass
+
+    def flush(self):
+        """Write pending LRU timestamps and enforce the size bound."""
+        with self._lock:
+            try:
+                self._flush_touched()
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE path = ?",
+                [(t, p) for p, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self):
+        self._puts_since_evict = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE path IN"
+                " (SELECT path FROM entries ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+
+_default: MetadataCache | None = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> MetadataCache:
+    """Process-wide cache stored in the user cache directory."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = MetadataCache(user_cache_dir() / "metadata.sqlite3")
+        return _default
@@ -1,56 +1,216 @@
+import struct
+import sys
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
 
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3
+import tracing
+import formats
+from metadata_cache import MetadataCache, default_cache
+from mp3_scan import exact_duration
 
 
-@dataclass
+@dataclass(slots=True)
 class Track:
     source_path: str
     title: str
     duration_secs: float
     original_filename: str
+    file_size: int = 0  # lets relocation tell same-named files apart
+    lufs: float | None = None  # integrated loudness, once analysed
+    true_peak_db: float | None = None
 
     @classmethod
-    def from_file(cls, path: str) -> "Track":
+    @tracing.traced("Track.from_file", "metadata")
+    def from_file(cls, path: str, cache: "MetadataCache | None" = None,
+                  exact: bool = False) -> "Track":
         p = Path(path)
-        title = p.stem
-        duration = 0.0
-        try:
-            mp3 = MP3(path)
-            duration = mp3.info.length
-        except Exception:
-            pass
+        resolved = p.resolve()
+        if cache is None:
+            cache = default_cache()
         try:
-            tags = ID3(path)
-            tit2 = tags.get("TIT2")
-            if tit2 and str(tit2):
-                title = str(tit2)
-        except Exception:
-            pass
+            st = resolved.stat()
+        except OSError:
+            st = None
+        fields = cache.get(str(resolved), st) if st else None
+        if fields is None:
+            fields = read_metadata(path)
+            if st:
+                cache.put(str(resolved), st, fields)
+        duration = fields.get("duration_secs", 0.0)
+        if exact and st and fields.get("format", formats.MP3.name) == formats.MP3.name:
+            if "exact_duration_secs" not in fields:
+                exact_secs = exact_duration(str(resolved))
+                if exact_secs is not None:
+                    fields["exact_duration_secs"] = exact_secs
+                    cache.update(str(resolved), st, {"exact_duration_secs": exact_secs})
+            duration = fields.get("exact_duration_secs", duration)
         return cls(
-            source_path=str(p.resolve()),
-            title=title,
+            source_path=sys.intern(str(resolved)),
+            title=fields.get("title") or p.stem,
             duration_secs=duration,
-            original_filename=p.name,
+            original_filename=sys.intern(p.name),
+            file_size=st.st_size if st else 0,
         )
 
 
+def read_metadata(path: str) -> dict:
+    """Parse title and duration from the file itself (no cache)."""
+    provider = formats.provider_for(path)
+    try:
+        fields = provider.probe(path)
+    except (OSError, ValueError, struct.error):  # damaged headers
+        fields = None
+    if fields is None:
+        fields = provider.probe_full(path)
+    fields["format"] = provider.name
+    return fields
+
+
+def read_metadata_mutagen(path: str) -> dict:
+    """Full mutagen parse, used when the header-only reader can't decide."""
+    return formats.provider_for(path).probe_full(path)
+
+
+CD_LIMIT_SECS = 4800.0
+
+
+class DurationIndex:
+    """Fenwick tree over track durations.
+
+    Prefix sums (track start offsets) and the total are O(log n); appending,
+    dropping the last track and changing one duration are O(log n). Moving
+    a track updates only the k positions it passes, O(k log n). Inserts
+    and removals in the middle shift every later position, so those rebuild
+    the tree in O(n). Values and tree are typed arrays (8 bytes per entry).
+    """
+
+    def __init__(self, durations=()):
+        self.build(durations)
+
+    def build(self, durations):
+        self._values = array("d", durations)
+        n = len(self._values)
+        tree = array("d", [0.0])
+        tree.extend(self._values)
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _add(self, i: int, delta: float):
+        i += 1
+        n = len(self._values)
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count: int) -> float:
+        """Sum of the first ``count`` durations."""
+        total = 0.0
+        while count > 0:
+            total += self._tree[count]
+            count -= count & -count
+        return total
+
+    def total(self) -> float:
+        return self.prefix(len(self._values))
+
+    def set(self, index: int, value: float):
+        self._add(index, float(value) - self._values[index])
+        self._values[index] = float(value)
+
+    def append(self, value: float):
+        n = len(self._values) + 1
+        self._values.append(float(value))
+        # Node n covers (n - lowbit(n), n]
+        self._tree.append(float(value) + self.prefix(n - 1) - self.prefix(n - (n & -n)))
+
+    def pop(self):
+        self._values.pop()
+        self._tree.pop()
+
+    def insert(self, index: int, values):
+        if index == len(self._values):
+            for v in values:
+                self.append(v)
+        else:
+            self.build(self._values[:index] + array("d", values) + self._values[index:])
+
+    def remove(self, indices):
+        indices = sorted(set(indices), reverse=True)
+        if all(i == len(self._values) - n for n, i in enumerate(indices, 1)):
+            for _ in indices:
+                self.pop()
+        else:
+            values = self._values
+            for i in indices:
+                del values[i]
+            self.build(values)
+
+    def move(self, src: int, dst: int):
+        # Only positions between src and dst change value: shift them in place
+        moved = self._values[src]
+        step = 1 if dst > src else -1
+        for i in range(src, dst, step):
+            self.set(i, self._values[i + step])
+        self.set(dst, moved)
+
+
 @dataclass
 class AlbumProject:
     band_name: str = ""
     album_name: str = ""
     tracks: list[Track] = field(default_factory=list)
+    _durations: DurationIndex = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._durations = DurationIndex(t.duration_secs for t in self.tracks)
+
+    # Mutations go through these methods so the duration index stays in step.
+    def set_tracks(self, tracks: list[Track]):
+        self.tracks = list(tracks)
+        self._durations.build(t.duration_secs for t in self.tracks)
+
+    def insert(self, index: int, tracks: list[Track]):
+        self.tracks[index:index] = tracks
+        self._durations.insert(index, [t.duration_secs for t in tracks])
+
+    def remove(self, indices) -> list[Track]:
+        indices = sorted(set(indices), reverse=True)
+        removed = [self.tracks.pop(i) for i in indices]
+        self._durations.remove(indices)
+        return removed[::-1]
+
+    def move(self, src: int, dst: int):
+        self.tracks.insert(dst, self.tracks.pop(src))
+        self._durations.move(src, dst)
+
+    def set_duration(self, index: int, secs: float):
+        self.tracks[index].duration_secs = secs
+        self._durations.set(index, secs)
+
+    def _index(self) -> DurationIndex:
+        if len(self._durations) != len(self.tracks):  # list replaced directly
+            self._durations.build(t.duration_secs for t in self.tracks)
+        return self._durations
+
+    def start_offset(self, index: int) -> float:
+        """Seconds from the start of the disc to the start of track ``index``."""
+        return self._index().prefix(index)
 
     @property
     def total_duration(self) -> float:
-        return sum(t.duration_secs for t in self.tracks)
+        return self._index().total()
 
     @property
     def remaining(self) -> float:
-        return max(0.0, 4800.0 - self.total_duration)
+        return max(0.0, CD_LIMIT_SECS - self.total_duration)
 
     @property
     def over_limit(self) -> bool:
-        return self.total_duration > 4800.0
+        return self.total_duration > CD_LIMIT_SECS
@@ -0,0 +1,310 @@
+"""Header-only MP3 probing: ID3v2 title plus duration from the first frame.
+
+Everything is decided from one bounded read at the start of the file. When
+the headers don't allow a confident answer (unsynchronised or compressed
+title frames, no clean MPEG sync) ``read_mp3_info`` returns None and the
+caller falls back to mutagen.
+"""
+import os
+import struct
+
+HEAD_READ = 64 * 1024
+MAX_READ = 1024 * 1024
+ID3V1_TAIL = 128 + 5  # room to spot an APEv2 footer right before the tag
+
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_BITRATES[(2, 3)] = _BITRATES[(2, 2)]
+
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+_TEXT_ENCODINGS = {0: "latin-1", 1: "utf-16", 2: "utf-16-be", 3: "utf-8"}
+
+
+class MPEGFrameHeader:
+    """Decoded 4-byte MPEG audio frame header."""
+
+    __slots__ = ("version", "layer", "bitrate", "sample_rate", "padding",
+                 "mode", "samples", "slot", "length")
+
+    def __init__(self, version, layer, bitrate, sample_rate, padding, mode):
+        self.version = version
+        self.layer = layer
+        self.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.padding = padding
+        self.mode = mode
+        if layer == 1:
+            self.samples, self.slot = 384, 4  # Layer I counts in 4-byte slots
+        elif version != 1 and layer == 3:
+            self.samples, self.slot = 576, 1
+        else:
+            self.samples, self.slot = 1152, 1
+        self.length = self.frame_length(bitrate, padding)
+
+    def frame_length(self, bitrate, padding):
+        """Bytes in a frame of this stream with the given bitrate and padding
+        (works elementwise on NumPy arrays too)."""
+        per_slot = self.samples // 8 // self.slot  # 12 for Layer I, else 144 or 72
+        return (per_slot * bitrate // self.sample_rate + padding) * self.slot
+
+
+def parse_frame_header(data, pos: int = 0) -> MPEGFrameHeader | None:
+    """Decode the frame header at ``data[pos:pos + 4]``, or None if invalid."""
+    if pos + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[pos], data[pos + 1], data[pos + 2], data[pos + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 0x3
+    layer_bits = (b1 >> 1) & 0x3
+    bitrate_idx = b2 >> 4
+    rate_idx = (b2 >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or rate_idx == 3 \
+            or bitrate_idx in (0, 15):
+        return None
+    version = (2.5, None, 2, 1)[version_bits]
+    layer = 4 - layer_bits
+    table = _BITRATES[(1 if version == 1 else 2, layer)]
+    return MPEGFrameHeader(
+        version=version,
+        layer=layer,
+        bitrate=table[bitrate_idx] * 1000,
+        sample_rate=_SAMPLE_RATES[version][rate_idx],
+        padding=(b2 >> 1) & 0x1,
+        mode=b3 >> 6,
+    )
+
+
+def syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def to_syncsafe(value: int) -> bytes:
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+
+def pad_id3v2_tag(tag: bytes, size: int) -> bytes:
+    """Grow a footer-less ID3v2 tag to exactly ``size`` bytes with padding."""
+    if size < len(tag) or tag[5] & 0x10:
+        raise ValueError("Tag can't be padded to that size")
+    return tag[:6] + to_syncsafe(size - 10) + tag[10:] + bytes(size - len(tag))
+
+
+def id3v2_tag_size(header: bytes) -> int:
+    """Total bytes of the ID3v2 tag starting at ``header`` (0 if none)."""
+    if len(header) < 10 or header[:3] != b"ID3":
+        return 0
+    size = 10 + syncsafe(header[6:10])
+    if header[5] & 0x10:  # footer present
+        size += 10
+    return size
+
+
+def _decode_text(payload: bytes) -> str | None:
+    if not payload:
+        return None
+    encoding = _TEXT_ENCODINGS.get(payload[0])
+    if encoding is None:
+        return None
+    try:
+        text = payload[1:].decode(encoding)
+    except UnicodeDecodeError:
+        return None
+    return text.rstrip("\x00")
+
+
+class _Undecided(Exception):
+    pass
+
+
+def _find_title(buf: bytes, tag_end: int) -> str | None:
+    """TIT2/TT2 from the ID3v2 tag at the start of ``buf``.
+
+    Returns "" if the frame is present but empty and None if it is absent
+    (mutagen only falls back to an ID3v1 title in the latter case).
+    """
+    major = buf[3]
+    flags = buf[5]
+    if major not in (2, 3, 4):
+        raise _Undecided
+    if flags & 0x80 and major < 4:  # whole-tag unsynchronisation
+        raise _Undecided
+    pos = 10
+    if flags & 0x40 and major >= 3:  # extended header
+        if major == 3:
+            pos += 4 + struct.unpack(">I", buf[pos:pos + 4])[0]
+        else:
+            pos += syncsafe(buf[pos:pos + 4])
+
+    id_len, head_len, title_id = (3, 6, b"TT2") if major == 2 else (4, 10, b"TIT2")
+    while pos + head_len <= tag_end:
+        frame_id = buf[pos:pos + id_len]
+        if frame_id[0] == 0:
+            return None  # padding
+        if not all(48 <= c <= 57 or 65 <= c <= 90 for c in frame_id):
+            raise _Undecided
+        if major == 2:
+            size = int.from_bytes(buf[pos + 3:pos + 6], "big")
+            frame_flags = 0
+        elif major == 3:
+            size = struct.unpack(">I", buf[pos + 4:pos + 8])[0]
+            frame_flags = buf[pos + 9] & 0xE0  # compression/encryption/grouping
+        else:
+            size = syncsafe(buf[pos + 4:pos + 8])
+            frame_flags = buf[pos + 9] & 0x4F  # grouping/compression/encryption/unsync/dli
+        start = pos + head_len
+        if start + size > tag_end:
+            raise _Undecided
+        if frame_id == title_id:
+            if frame_flags:
+                raise _Undecided
+            return _decode_text(buf[start:start + size]) or ""
+        pos = start + size
+    return None
+
+
+def id3v2_title(buf: bytes) -> str | None:
+    """Title from a whole ID3v2 tag in ``buf`` (as embedded in WAV files),
+    or None if it has none or can't be read from the header alone."""
+    tag_end = min(id3v2_tag_size(buf), len(buf))
+    if not tag_end:
+        return None
+    try:
+        return _find_title(buf, tag_end) or None
+    except (_Undecided, struct.error, IndexError):
+        return None
+
+
+def _id3v1_title(tail: bytes) -> str | None:
+    """Title of an ID3v1 tag in the last bytes of a file, read as mutagen does."""
+    idx = tail.find(b"TAG")
+    if idx == -1:
+        return None
+    ape = tail.find(b"APETAGEX")
+    if ape != -1 and idx == ape + 5:  # "TAG" inside an APEv2 footer
+        return None
+    data = tail[idx:]
+    if not 124 <= len(data) <= 128:
+        return None
+    return data[3:33].split(b"\0")[0].strip().decode("latin-1") or None
+
+
+def _lame_delay(buf: bytes, pos: int) -> int:
+    """Encoder delay + padding samples from a LAME tag at ``buf[pos]``."""
+    tag = buf[pos:pos + 24]
+    if len(tag) < 24 or not tag.startswith((b"LAME", b"L3.99")):
+        return 0
+    version = tag[:9].lstrip(b"EMAL")
+    major, rest = version[:1], version[1:].lstrip(b".")
+    minor = b""
+    for c in rest:
+        if not 48 <= c <= 57:
+            break
+        minor += bytes([c])
+    try:
+        if (int(major), int(minor)) < (3, 90):
+            return 0
+    except ValueError:
+        return 0
+    if tag[9] >> 4 != 0:  # unsupported tag revision
+        return 0
+    delay = (tag[21] << 4) | (tag[22] >> 4)
+    padding = ((tag[22] & 0x0F) << 8) | tag[23]
+    return delay + padding
+
+
+def parse_vbr_header(buf, pos: int, frame: MPEGFrameHeader) -> tuple[int, int] | None:
+    """(frame count, gapless trim samples) from a Xing/Info or VBRI header.
+
+    Returns None if the frame at ``pos`` carries no usable VBR header.
+    """
+    if frame.layer != 3:
+        return None
+    if frame.version == 1:
+        xing = pos + (21 if frame.mode == 3 else 36)
+    else:
+        xing = pos + (13 if frame.mode == 3 else 21)
+    if buf[xing:xing + 4] in (b"Xing", b"Info") and xing + 8 <= len(buf):
+        flags = struct.unpack(">I", buf[xing + 4:xing + 8])[0]
+        if not flags & 0x1:
+            return None
+        field = xing + 8
+        if field + 4 > len(buf):
+            return None  # cut off inside the header
+        frames = struct.unpack(">I", buf[field:field + 4])[0]
+        field += 4
+        if flags & 0x2:
+            field += 4
+        if flags & 0x4:
+            field += 100
+        if flags & 0x8:
+            field += 4
+        return frames, _lame_delay(buf, field)
+    vbri = pos + 36
+    if buf[vbri:vbri + 4] == b"VBRI" and vbri + 26 <= len(buf):
+        version, = struct.unpack(">H", buf[vbri + 4:vbri + 6])
+        entry_size, = struct.unpack(">H", buf[vbri + 22:vbri + 24])
+        # mutagen ignores headers it can't parse the TOC of
+        if version != 1 or entry_size not in (2, 4):
+            return None
+        return struct.unpack(">I", buf[vbri + 14:vbri + 18])[0], 0
+    return None
+
+
+def audio_start(buf) -> int:
+    """Offset just past any ID3v2 tags at the start of ``buf``."""
+    pos = 0
+    while buf[pos:pos + 3] == b"ID3":
+        size = id3v2_tag_size(buf[pos:pos + 10])
+        if not size:
+            break
+        pos += size
+    return pos
+
+
+def read_mp3_info(path: str) -> dict | None:
+    """Title and duration from the file headers, or None if undecidable."""
+    with open(path, "rb") as f:
+        buf = f.read(HEAD_READ)
+        file_size = os.fstat(f.fileno()).st_size
+        tag_end = id3v2_tag_size(buf)
+        if tag_end + 4096 > len(buf) and len(buf) < file_size:
+            if tag_end + 4096 > MAX_READ:
+                return None
+            buf += f.read(tag_end + 4096 - len(buf))
+        f.seek(max(0, file_size - ID3V1_TAIL))
+        tail = f.read(ID3V1_TAIL)
+
+    try:
+        title = _find_title(buf, min(tag_end, len(buf))) if tag_end else None
+    except (_Undecided, struct.error, IndexError):
+        return None
+    if title is None:
+        title = _id3v1_title(tail)
+    title = title or None
+
+    pos = buf.find(b"\xff", audio_start(buf))
+    while pos != -1:
+        frame = parse_frame_header(buf, pos)
+        if frame:
+            vbr = parse_vbr_header(buf, pos, frame)
+            if vbr is not None:
+                frames, trim = vbr
+                samples = max(frame.samples * frames - trim, 0)
+                return {"title": title, "duration_secs": samples / frame.sample_rate}
+            # Without a VBR header, require a second frame right behind it
+            if parse_frame_header(buf, pos + frame.length):
+                content = file_size - pos
+                return {"title": title, "duration_secs": 8 * content / frame.bitrate}
+        pos = buf.find(b"\xff", pos + 1)
+    return None
@@ -0,0 +1,143 @@
+"""Exact MP3 durations by counting every MPEG frame.
+
+The file is memory-mapped and sync words are located with NumPy instead of
+a per-byte loop. Every candidate header is decoded in bulk, linked to the
+candidate that should follow it, and the frame chain starting at the first
+real frame is measured by pointer jumping, so the whole scan stays
+vectorised even for very large files.
+"""
+import importlib.util
+import mmap
+import os
+
+from mp3_header import audio_start, parse_frame_header, parse_vbr_header
+
+CHUNK = 32 * 1024 * 1024
+MIN_CHAIN = 4
+
+# NumPy is imported on first use: it is slow to import and exact mode is optional
+np = None
+available = importlib.util.find_spec("numpy") is not None
+
+
+def _load_numpy():
+    global np, _BITRATE_TABLE
+    if np is None:
+        import numpy
+        # bitrate (kbps) by [mpeg1?, layer - 1, index]
+        _BITRATE_TABLE = numpy.array([
+            [[0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256, 0],
+             [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+             [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0]],
+            [[0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448, 0],
+             [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384, 0],
+             [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]],
+        ], dtype=numpy.int64)
+        np = numpy
+
+
+def _sync_candidates(view):
+    """Offsets of bytes 0xFF followed by the 3 remaining sync bits."""
+    found = []
+    limit = len(view) - 3
+    for off in range(0, limit, CHUNK):
+        chunk = view[off:min(off + CHUNK, limit)]
+        hits = np.flatnonzero(chunk == 0xFF) + off
+        found.append(hits[(view[hits + 1] & 0xE0) == 0xE0])
+    return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+def _count_frames(view, first: int, frame) -> int:
+    """Number of frames in the stream that ``first`` starts."""
+    pos = _sync_candidates(view)
+    if not len(pos):
+        return 0
+    b1 = view[pos + 1]
+    b2 = view[pos + 2]
+
+    # Keep only headers with the stream's version, layer and sample rate
+    same = ((b1 & 0xFE) == (view[first + 1] & 0xFE)) \
+        & (((b2 >> 2) & 0x3) == ((view[first + 2] >> 2) & 0x3))
+    bitrate_idx = (b2 >> 4).astype(np.int64)
+    same &= (bitrate_idx != 0) & (bitrate_idx != 15)
+    pos, b2, bitrate_idx = pos[same], b2[same], bitrate_idx[same]
+
+    mpeg1 = 1 if frame.version == 1 else 0
+    bitrate = _BITRATE_TABLE[mpeg1, frame.layer - 1, bitrate_idx] * 1000
+    padding = ((b2 >> 1) & 0x1).astype(np.int64)
+    length = frame.frame_length(bitrate, padding)
+
+    # Link every candidate to the candidate that starts where it ends
+    ends = pos + length
+    n = len(pos)
+    idx = np.searchsorted(pos, ends)
+    idx_clipped = np.minimum(idx, n - 1)
+    linked = (idx < n) & (pos[idx_clipped] == ends)
+    nxt = np.where(linked, idx_clipped, n)
+    nxt = np.append(nxt, n)  # sentinel
+    count = np.ones(n + 1, dtype=np.int64)
+    count[n] = 0
+    last_end = np.append(ends, 0)
+
+    # Pointer jumping: count[i] becomes the length of the chain from i
+    while True:
+        has_next = nxt != n
+        if not has_next.any():
+            break
+        count = count + count[nxt]
+        last_end = np.where(has_next, last_end[nxt], last_end)
+        nxt = nxt[nxt]
+
+    total = 0
+    start = int(np.searchsorted(pos, first))
+    while start < n:
+        total += int(count[start])
+        # Resync after a damaged frame: next solid chain past the break
+        following = np.flatnonzero(count[start + 1:n] >= MIN_CHAIN)
+        following = following[pos[start + 1 + following] >= last_end[start]]
+        if not len(following):
+            break
+        start = start + 1 + int(following[0])
+    return total
+
+
+def _first_frame(mm, start: int, end: int):
+    """First header that is directly followed by another valid header."""
+    pos = mm.find(b"\xff", start, end)
+    while pos != -1:
+        frame = parse_frame_header(mm, pos)
+        if frame and parse_frame_header(mm, pos + frame.length):
+            return pos, frame
+        pos = mm.find(b"\xff", pos + 1, end)
+    return -1, None
+
+
+def exact_duration(path: str) -> float | None:
+    """Duration from the real frame count, or None if it can't be scanned."""
+    if not available:
+        return None
+    _load_numpy()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 4:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = audio_start(mm)
+            end = len(mm)
+            if end - start >= 128 and mm[end - 128:end - 125] == b"TAG":
+                end -= 128
+            first, frame = _first_frame(mm, start, end)
+            if frame is None:
+                return None
+            trim = 0
+            vbr = parse_vbr_header(mm, first, frame)
+            if vbr is not None:
+                trim = vbr[1]
+            view = np.frombuffer(mm, dtype=np.uint8, count=end)
+            try:
+                frames = _count_frames(view, first, frame)
+            finally:
+                del view
+            if vbr is not None:
+                frames -= 1  # the Xing/VBRI frame carries no audio
+            samples = max(frames * frame.samples - trim, 0)
+            return samples / frame.sample_rate
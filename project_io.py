@@ -1,64 +1,397 @@
 import json
+import os
+import struct
+import sys
 from pathlib import Path
-from tkinter import filedialog, messagebox
+from typing import BinaryIO, Iterator
 
+import tracing
 from models import AlbumProject, Track
+from metadata_cache import default_cache
+from source_files import relocate, stat_all
+from workspace import DEFAULT_VERSION, Workspace
 
+# Compact format: magic, then length-prefixed records. The first record is
+# the header (band, album, track count); each following record is a track.
+# Readers skip unknown trailing bytes in a record, so fields can be added.
+COMPACT_MAGIC = b"ALBP\x01"
+COMPACT_EXT = ".albumpack"
+_LEN = struct.Struct("<I")
+_STR_LEN = struct.Struct("<H")
+_DURATION = struct.Struct("<d")
+_COUNT = struct.Struct("<Q")
 
-def save_project(project: AlbumProject, parent=None) -> str | None:
-    path = filedialog.asksaveasfilename(
-        parent=parent,
-        title="Save Album Project",
-        defaultextension=".albumplan",
-        filetypes=[("Album Plan", "*.albumplan"), ("All files", "*.*")]
-    )
-    if not path:
+# A JSON workspace holds every track once in "tracks" and each version's
+# running order as indices into it; readers of plain projects see the
+# active version.
+WORKSPACE_FORMAT = "albumplanner-workspace"
+
+FILETYPES = [("Album Plan", "*.albumplan"), ("Album Plan (compact)", "*" + COMPACT_EXT),
+             ("All files", "*.*")]
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    if len(data) > 0xFFFF:
+        raise ValueError(f"String too long for compact project: {value[:40]}...")
+    return _STR_LEN.pack(len(data)) + data
+
+
+def _unpack_str(buf: bytes, pos: int) -> tuple[str, int]:
+    (n,) = _STR_LEN.unpack_from(buf, pos)
+    pos += _STR_LEN.size
+    return buf[pos:pos + n].decode("utf-8"), pos + n
+
+
+def _write_record(f: BinaryIO, payload: bytes):
+    f.write(_LEN.pack(len(payload)))
+    f.write(payload)
+
+
+def _read_record(f: BinaryIO) -> bytes | None:
+    head = f.read(_LEN.size)
+    if not head:
         return None
+    if len(head) < _LEN.size:
+        raise ValueError("Truncated project file")
+    (n,) = _LEN.unpack(head)
+    payload = f.read(n)
+    if len(payload) < n:
+        raise ValueError("Truncated project file")
+    return payload
+
+
+def _track_record(t: Track) -> dict:
+    return {
+        "source_path": t.source_path,
+        "title": t.title,
+        "duration_secs": t.duration_secs,
+        "original_filename": t.original_filename,
+        "file_size": t.file_size,
+    }
+
+
+def _track_from_record(td: dict) -> Track:
+    return Track(
+        source_path=sys.intern(td["source_path"]),
+        title=td["title"],
+        duration_secs=td["duration_secs"],
+        original_filename=sys.intern(td["original_filename"]),
+        file_size=td.get("file_size", 0),
+    )
+
+
+def _json_album(data: dict) -> tuple[str, str, list[dict]]:
+    """Band, album and track records of a JSON project (for a workspace,
+    of its active version)."""
+    if data.get("format") != WORKSPACE_FORMAT:
+        return data.get("band_name", ""), data.get("album_name", ""), data.get("tracks", [])
+    versions = data["versions"]
+    version = next((v for v in versions if v["name"] == data.get("active")), versions[0])
+    library = data["tracks"]
+    return (version.get("band_name", ""), version.get("album_name", ""),
+            [library[i] for i in version["order"]])
+
+
+def _is_compact(path: str | Path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC
+
+
+@tracing.traced("write_project", "project")
+def write_project(project: AlbumProject, path: str | Path, compact: bool | None = None):
+    """Save a project without any UI. ``compact`` defaults from the extension."""
+    if compact is None:
+        compact = str(path).endswith(COMPACT_EXT)
+    if not compact:
+        data = {
+            "band_name": project.band_name,
+            "album_name": project.album_name,
+            "tracks": [_track_record(t) for t in project.tracks],
+        }
+        Path(path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+        return
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(COMPACT_MAGIC)
+        _write_record(f, _pack_str(project.band_name) + _pack_str(project.album_name)
+                      + _COUNT.pack(len(project.tracks)))
+        for t in project.tracks:
+            _write_record(f, _DURATION.pack(t.duration_secs) + _pack_str(t.source_path)
+                          + _pack_str(t.title) + _pack_str(t.original_filename)
+                          + _COUNT.pack(t.file_size))
+    os.replace(tmp, path)
+
+
+def read_header(path: str | Path) -> dict:
+    """Band, album and track count, reading only the header of compact files."""
+    if not _is_compact(path):
+        band, album, records = _json_album(json.loads(Path(path).read_text(encoding="utf-8")))
+        return {"band_name": band, "album_name": album, "track_count": len(records)}
+    with open(path, "rb") as f:
+        f.seek(len(COMPACT_MAGIC))
+        return _parse_header(_read_record(f))
+
+
+def _parse_header(payload: bytes | None) -> dict:
+    if payload is None:
+        raise ValueError("Missing project header")
+    band, pos = _unpack_str(payload, 0)
+    album, pos = _unpack_str(payload, pos)
+    (count,) = _COUNT.unpack_from(payload, pos)
+    return {"band_name": band, "album_name": album, "track_count": count}
+
+
+def iter_tracks(path: str | Path) -> Iterator[Track]:
+    """Yield the project's tracks one at a time (streamed for compact files)."""
+    if not _is_compact(path):
+        _, _, records = _json_album(json.loads(Path(path).read_text(encoding="utf-8")))
+        for td in records:
+            yield _track_from_record(td)
+        return
+    with open(path, "rb", buffering=256 * 1024) as f:
+        f.seek(len(COMPACT_MAGIC))
+        _read_record(f)  # header
+        while (payload := _read_record(f)) is not None:
+            (duration,) = _DURATION.unpack_from(payload, 0)
+            source_path, pos = _unpack_str(payload, _DURATION.size)
+            title, pos = _unpack_str(payload, pos)
+            original_filename, pos = _unpack_str(payload, pos)
+            file_size = 0
+            if len(payload) >= pos + _COUNT.size:  # absent in older files
+                (file_size,) = _COUNT.unpack_from(payload, pos)
+            yield Track(
+                source_path=sys.intern(source_path),
+                title=title,
+                duration_secs=duration,
+                original_filename=sys.intern(original_filename),
+                file_size=file_size,
+            )
+
+
+@tracing.traced("read_project", "project")
+def read_project(path: str | Path, refresh: bool = True) -> tuple[AlbumProject, list[int]]:
+    """Load a project without any UI.
+
+    Returns the project and the indices of tracks whose source is missing.
+    Sources are stat'ed concurrently. With ``refresh`` durations of files
+    that changed since the project was saved are taken from the metadata
+    cache, or re-read if the cache doesn't know them either.
+    """
+    project, missing, stale = _read_album(path, refresh)
+    for i in stale:
+        project.set_duration(i, Track.from_file(project.tracks[i].source_path).duration_secs)
+    if stale:
+        default_cache().flush()
+    return project, missing
+
+
+def _read_album(path: str | Path, refresh: bool, data: dict | None = None
+                ) -> tuple[AlbumProject, list[int], list[int]]:
+    """Load a plain project; ``data`` is the already decoded JSON, if any."""
+    if data is None and _is_compact(path):
+        header = read_header(path)
+        band, album = header["band_name"], header["album_name"]
+        tracks = list(iter_tracks(path))
+    else:  # parse the JSON once rather than once per step
+        if data is None:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        band, album, records = _json_album(data)
+        tracks = [_track_from_record(td) for td in records]
+    missing, stale = _check_sources(tracks, refresh)
+    project = AlbumProject(band_name=band, album_name=album, tracks=tracks)
+    return project, missing, stale
+
+
+def _check_sources(tracks: list[Track], refresh: bool) -> tuple[list[int], list[int]]:
+    """Stat every source (concurrently), updating sizes and, with
+    ``refresh``, durations from the metadata cache.
+
+    Returns the indices of missing sources and of sources that changed
+    since the project was saved but aren't cached; those keep their saved
+    duration until the caller re-reads them. A saved duration is only
+    replaced by an exact one, or when the file's size changed, so durations
+    measured in exact mode are never swapped for header estimates.
+    """
+    stats = stat_all([t.source_path for t in tracks])
+    cache = default_cache() if refresh else None
+    missing, stale = [], []
+    for i, (track, st) in enumerate(zip(tracks, stats)):
+        if st is None:
+            missing.append(i)
+            continue
+        if cache is not None:
+            cached = cache.get(track.source_path, st)
+            if cached is not None and "exact_duration_secs" in cached:
+                track.duration_secs = cached["exact_duration_secs"]
+            elif track.file_size != st.st_size:  # rewritten (or saved without a size)
+                if cached is not None:
+                    track.duration_secs = cached.get("duration_secs", track.duration_secs)
+                else:
+                    stale.append(i)
+        track.file_size = st.st_size
+    return missing, stale
+
+
+@tracing.traced("write_workspace", "project")
+def write_workspace(workspace: Workspace, path: str | Path):
+    """Save every album version. A lone default version is written as a
+    plain project; several versions need the JSON format."""
+    if len(workspace.versions) == 1 and workspace.active == DEFAULT_VERSION:
+        write_project(workspace.project, path)
+        return
+    if str(path).endswith(COMPACT_EXT):
+        if len(workspace.versions) > 1:
+            raise ValueError("Album versions can only be saved as .albumplan files; "
+                             "the compact format holds a single album.")
+        write_project(workspace.project, path, compact=True)
+        return
+    library = workspace.library()
+    index = {t.source_path: i for i, t in enumerate(library)}
     data = {
-        "band_name": project.band_name,
-        "album_name": project.album_name,
-        "tracks": [
+        "format": WORKSPACE_FORMAT,
+        "active": workspace.active,
+        "tracks": [_track_record(t) for t in library],
+        "versions": [
             {
-                "source_path": t.source_path,
-                "title": t.title,
-                "duration_secs": t.duration_secs,
-                "original_filename": t.original_filename,
+                "name": name,
+                "band_name": project.band_name,
+                "album_name": project.album_name,
+                "order": [index[t.source_path] for t in project.tracks],
             }
-            for t in project.tracks
+            for name, project in workspace.versions.items()
         ],
     }
     Path(path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+
+@tracing.traced("read_workspace", "project")
+def read_workspace(path: str | Path, refresh: bool = True
+                   ) -> tuple[Workspace, list[int], list[Track]]:
+    """Load every album version of a workspace (a plain project becomes a
+    single version). Missing sources are returned as indices into
+    ``workspace.library()``, which is what ``relink_missing`` expects.
+
+    Unlike ``read_project`` nothing is parsed here: tracks whose files
+    changed and aren't cached are returned for the caller to re-read in
+    the background (``TrackList.refresh_durations``).
+    """
+    data = None
+    if not _is_compact(path):
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if data is None or data.get("format") != WORKSPACE_FORMAT:
+        project, missing, stale = _read_album(path, refresh, data)
+        library = list(project.tracks)
+        workspace = Workspace.single(project)
+    else:
+        library = [_track_from_record(td) for td in data["tracks"]]
+        missing, stale = _check_sources(library, refresh)
+        workspace = Workspace()
+        for v in data["versions"]:
+            workspace.add_version(v["name"], AlbumProject(
+                band_name=v.get("band_name", ""),
+                album_name=v.get("album_name", ""),
+                tracks=[library[i] for i in v["order"]],
+            ))
+        if data.get("active") in workspace.versions:
+            workspace.active = data["active"]
+    lost = {library[i].source_path for i in missing}
+    changed = {library[i].source_path for i in stale}
+    library = workspace.library()
+    missing = [i for i, t in enumerate(library) if t.source_path in lost]
+    return workspace, missing, [t for t in library if t.source_path in changed]
+
+
+def relink_missing(project: AlbumProject, missing: list[int], roots: list[str]) -> list[int]:
+    """Point missing tracks at files found under ``roots``.
+
+    Returns the indices that are still missing.
+    """
+    found = relocate(project.tracks, missing, roots)
+    for i, new_path in found.items():
+        relinked = Track.from_file(new_path)
+        track = project.tracks[i]
+        track.source_path = relinked.source_path
+        track.file_size = relinked.file_size
+        track.duration_secs = relinked.duration_secs
+    if found:
+        default_cache().flush()
+        project.set_tracks(project.tracks)  # refresh the duration index
+    return [i for i in missing if i not in found]
+
+
+@tracing.traced("save_workspace", "project")
+def save_workspace(workspace: Workspace, parent=None) -> str | None:
+    from tkinter import filedialog, messagebox
+
+    path = filedialog.asksaveasfilename(
+        parent=parent,
+        title="Save Album Project",
+        defaultextension=".albumplan",
+        filetypes=FILETYPES
+    )
+    if not path:
+        return None
+    try:
+        write_workspace(workspace, path)
+    except ValueError as e:
+        messagebox.showerror("Save error", str(e), parent=parent)
+        return None
     return path
 
 
-def load_project(parent=None) -> AlbumProject | None:
+@tracing.traced("load_workspace", "project")
+def load_workspace(parent=None) -> tuple[Workspace, list[Track]] | None:
+    """Ask for a project file and load it; returns the workspace and the
+    tracks whose durations should be re-read in the background."""
+    from tkinter import filedialog
+
     path = filedialog.askopenfilename(
         parent=parent,
         title="Load Album Project",
-        filetypes=[("Album Plan", "*.albumplan"), ("All files", "*.*")]
+        filetypes=FILETYPES
     )
     if not path:
         return None
-    data = json.loads(Path(path).read_text(encoding="utf-8"))
-    tracks = []
-    missing = []
-    for td in data.get("tracks", []):
-        if not Path(td["source_path"]).exists():
-            missing.append(td["original_filename"])
-        tracks.append(Track(
-            source_path=td["source_path"],
-            title=td["title"],
-            duration_secs=td["duration_secs"],
-            original_filename=td["original_filename"],
-        ))
+    workspace, missing, stale = read_workspace(path)
     if missing:
-        messagebox.showwarning(
+        library = AlbumProject(tracks=workspace.library())
+        _relink_dialog(library, missing, parent)
+        workspace.refresh()  # relinked tracks changed path and duration in place
+    return workspace, stale
+
+
+def _relink_dialog(project: AlbumProject, missing: list[int], parent=None):
+    """Offer to search folders for missing sources until the user stops."""
+    from tkinter import filedialog, messagebox
+
+    while missing:
+        names = [project.tracks[i].original_filename for i in missing]
+        shown = "\n".join(names[:20])
+        if len(names) > 20:
+            shown += f"\n... and {len(names) - 20} more"
+        if not messagebox.askyesno(
             "Missing files",
-            f"These source files were not found:\n" + "\n".join(missing),
+            f"These source files were not found:\n{shown}\n\n"
+            "Search a folder for them?",
             parent=parent,
-        )
-    return AlbumProject(
-        band_name=data.get("band_name", ""),
-        album_name=data.get("album_name", ""),
-        tracks=tracks,
-    )
+        ):
+            break
+        root = filedialog.askdirectory(parent=parent, title="Search for Missing Files")
+        if not root:
+            break
+        if parent is not None:
+            parent.configure(cursor="watch")
+            parent.update_idletasks()
+        try:
+            still_missing = relink_missing(project, missing, [root])
+        finally:
+            if parent is not None:
+                parent.configure(cursor="")
+        if len(still_missing) < len(missing):
+            messagebox.showinfo(
+                "Missing files",
+                f"Relinked {len(missing) - len(still_missing)} of {len(missing)} files.",
+                parent=parent,
+            )
+        missing = still_missing
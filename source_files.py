@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+STAT_WORKERS = 16  # stats are latency-bound on network shares and USB drives
+
+
+def stat_all(paths: list[str], max_workers: int = STAT_WORKERS) -> list[os.stat_result | None]:
+    """os.stat for every path concurrently; None where the file is missing."""
+    def stat(path):
+        try:
+            return os.stat(path)
+        except OSError:
+            return None
+
+    if len(paths) < 64:
+        return [stat(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(stat, paths, chunksize=64))
+
+
+def iter_files(roots: Iterable[str], ordered: bool = False) -> Iterator[os.DirEntry]:
+    """Every regular file under ``roots``, walked with os.scandir.
+
+    Directories are visited depth-first from an explicit stack, so memory
+    depends on tree depth rather than on how many files there are. With
+    ``ordered`` each directory is listed in name order (holding one
+    directory listing at a time).
+    """
+    stack = list(roots)[::-1]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                entries = sorted(it, key=lambda e: e.name.lower()) if ordered else it
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file():
+                            yield entry
+                    except OSError:
+                        continue
+                stack.extend(reversed(subdirs))
+        except OSError:
+            continue
+
+
+def build_relocation_index(roots: Iterable[str], names: set[str]) -> dict[str, list[tuple[int, str]]]:
+    """One sweep over ``roots`` mapping wanted lower-case file names to
+    (size, path) candidates."""
+    index: dict[str, list[tuple[int, str]]] = {}
+    for entry in iter_files(roots):
+        key = entry.name.lower()
+        if key in names:
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                continue
+            index.setdefault(key, []).append((size, entry.path))
+    return index
+
+
+def relocate(tracks, indices: list[int], roots: Iterable[str]) -> dict[int, str]:
+    """Find new paths for the tracks at ``indices`` by filename and size.
+
+    A candidate must have the recorded size when the track knows it;
+    otherwise the filename must be unique across the search roots.
+    """
+    names = {tracks[i].original_filename.lower() for i in indices}
+    index = build_relocation_index(roots, names)
+    found = {}
+    for i in indices:
+        track = tracks[i]
+        candidates = index.get(track.original_filename.lower(), [])
+        if track.file_size:
+            candidates = [c for c in candidates if c[0] == track.file_size]
+        if len(candidates) == 1 or (track.file_size and candidates):
+            found[i] = candidates[0][1]
+    return found
@@ -0,0 +1,94 @@
+"""Startup timing report, enabled with ``--startup-report`` or the
+ALBUMPLANNER_STARTUP_REPORT environment variable.
+
+Records how long each startup phase took and, like ``python -X
+importtime``, how long every module took to import (on its own and
+including what it imported). The summary goes to stderr once the window
+is idle.
+"""
+import importlib.abc
+import os
+import sys
+import time
+
+ENV_VAR = "ALBUMPLANNER_STARTUP_REPORT"
+FLAG = "--startup-report"
+
+enabled = False
+_t0 = time.perf_counter()
+_phases: list[tuple[str, float]] = []
+_imports: dict[str, tuple[float, float]] = {}  # module -> (self, cumulative) secs
+_stack: list[float] = []  # time spent in nested imports, per active import
+
+
+def requested(argv=None) -> bool:
+    argv = sys.argv if argv is None else argv
+    return FLAG in argv or bool(os.environ.get(ENV_VAR))
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader):
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._timed(spec.name, self._loader.create_module, spec)
+
+    def exec_module(self, module):
+        self._timed(module.__name__, self._loader.exec_module, module)
+
+    def _timed(self, name, fn, arg):
+        _stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return fn(arg)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+            own, total = _imports.get(name, (0.0, 0.0))
+            _imports[name] = (own + elapsed - nested, total + elapsed)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None:
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+def enable():
+    """Start timing imports; call as early as possible."""
+    global enabled
+    if not enabled:
+        enabled = True
+        sys.meta_path.insert(0, _TimingFinder())
+
+
+def mark(phase: str):
+    if enabled:
+        _phases.append((phase, time.perf_counter()))
+
+
+def report(top: int = 15, file=None):
+    if not enabled:
+        return
+    file = file or sys.stderr
+    print("Startup report (seconds since main started)", file=file)
+    last = _t0
+    for phase, at in _phases:
+        print(f"  {at - _t0:7.3f}  +{at - last:6.3f}  {phase}", file=file)
+        last = at
+    print(f"Slowest imports (self / cumulative, of {len(_imports)} modules)", file=file)
+    slowest = sorted(_imports.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (own, total) in slowest[:top]:
+        print(f"  {own:7.3f}  {total:7.3f}  {name}", file=file)
@@ -0,0 +1,191 @@
+"""Lightweight tracing of hot paths, enabled with ``--trace[=FILE]`` or the
+ALBUMPLANNER_TRACE environment variable (set to an output path or to 1).
+
+Spans are recorded with ``span()`` or the ``traced()`` decorator; when
+tracing is off both cost one flag check. ``watch_event_loop()`` also
+records Tk event-loop stalls. On exit the trace is written as Chrome
+trace-event JSON (open it in chrome://tracing or Perfetto) and a per-span
+summary goes to stderr.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+ENV_VAR = "ALBUMPLANNER_TRACE"
+FLAG = "--trace"
+DEFAULT_FILE = "albumplanner-trace.json"
+MAX_EVENTS = 500_000  # later events are counted but not kept
+STALL_THRESHOLD_MS = 100
+STALL_CHECK_MS = 50
+
+enabled = False
+output_path: str | None = None
+_t0 = time.perf_counter_ns()
+_events: list[tuple] = []  # (name, category, start ns, duration ns, thread id, args)
+_dropped = 0
+_thread_names: dict[int, str] = {}
+_NULL = nullcontext()
+
+
+def requested(argv=None) -> str | None:
+    """The trace output path asked for on the command line or in the
+    environment, or None if tracing was not requested."""
+    argv = sys.argv if argv is None else argv
+    for arg in argv:
+        if arg == FLAG:
+            return default_path()
+        if arg.startswith(FLAG + "="):
+            return arg.split("=", 1)[1] or default_path()
+    value = os.environ.get(ENV_VAR, "")
+    if value.lower() in ("", "0", "false", "no"):
+        return None
+    if value.lower() in ("1", "true", "yes"):
+        return default_path()
+    return value
+
+
+def default_path() -> str:
+    return os.path.join(tempfile.gettempdir(), DEFAULT_FILE)
+
+
+def enable(path: str | None = None):
+    """Start recording; the trace is written to ``path`` at exit."""
+    global enabled, output_path
+    output_path = path
+    if not enabled:
+        enabled = True
+        atexit.register(_on_exit)
+
+
+def _record(name: str, category: str, start: int, duration: int, args: dict | None):
+    global _dropped
+    if len(_events) >= MAX_EVENTS:
+        _dropped += 1
+        return
+    ident = threading.get_ident()
+    if ident not in _thread_names:  # worker threads may be gone by export time
+        _thread_names[ident] = threading.current_thread().name
+    _events.append((name, category, start, duration, ident, args))
+
+
+class _Span:
+    __slots__ = ("name", "category", "args", "start")
+
+    def __init__(self, name: str, category: str, args: dict | None):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.category, self.start,
+                time.perf_counter_ns() - self.start, self.args)
+
+
+def span(name: str, category: str = "app", **args):
+    """Context manager timing the enclosed block."""
+    if not enabled:
+        return _NULL
+    return _Span(name, category, args or None)
+
+
+def traced(name: str | None = None, category: str = "app"):
+    """Decorator timing every call of the wrapped function."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(label, category, start, time.perf_counter_ns() - start, None)
+        return wrapper
+    return decorate
+
+
+def watch_event_loop(root, threshold_ms: int = STALL_THRESHOLD_MS,
+                     interval_ms: int = STALL_CHECK_MS):
+    """Record a "Tk stall" span whenever the event loop runs a timer more
+    than ``threshold_ms`` late, i.e. when something blocked the UI."""
+    if not enabled:
+        return
+    interval = interval_ms * 1_000_000
+    threshold = threshold_ms * 1_000_000
+
+    def tick(expected: int):
+        now = time.perf_counter_ns()
+        late = now - expected
+        if late > threshold:
+            _record("Tk stall", "stall", expected, late, {"late_ms": late // 1_000_000})
+        root.after(interval_ms, tick, now + interval)
+
+    root.after(interval_ms, tick, time.perf_counter_ns() + interval)
+
+
+def chrome_trace() -> dict:
+    """The recorded spans in Chrome trace-event format."""
+    pid = os.getpid()
+    threads = {}
+    events = []
+    for name, category, start, duration, tid, args in list(_events):
+        tid = threads.setdefault(tid, len(threads))
+        event = {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+                 "ts": (start - _t0) / 1000, "dur": duration / 1000}
+        if args:
+            event["args"] = args
+        events.append(event)
+    for ident, tid in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                       "args": {"name": _thread_names.get(ident, f"thread {ident}")}})
+    return {"traceEvents": events, "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": _dropped}}
+
+
+def write(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+
+
+def summary() -> list[tuple[str, int, float, float, float]]:
+    """(name, count, total ms, mean ms, max ms) per span name, slowest first."""
+    stats: dict[str, list] = {}
+    for name, _, _, duration, _, _ in list(_events):
+        entry = stats.setdefault(name, [0, 0, 0])
+        entry[0] += 1
+        entry[1] += duration
+        entry[2] = max(entry[2], duration)
+    rows = [(name, count, total / 1e6, total / count / 1e6, peak / 1e6)
+            for name, (count, total, peak) in stats.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def report(file=None):
+    file = file or sys.stderr
+    print(f"Trace summary ({len(_events)} spans"
+          + (f", {_dropped} dropped" if _dropped else "") + ")", file=file)
+    print(f"  {'count':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  span", file=file)
+    for name, count, total, mean, peak in summary():
+        print(f"  {count:7d} {total:10.1f} {mean:9.2f} {peak:9.1f}  {name}", file=file)
+
+
+def _on_exit():
+    if output_path:
+        try:
+            write(output_path)
+            print(f"Trace written to {output_path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Could not write trace to {output_path}: {e}", file=sys.stderr)
+    report()
@@ -1,23 +1,94 @@
+import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from pathlib import Path
 
-from models import Track
+from models import AlbumProject, Track
+import formats
+import tracing
 from theme import COLORS
+from history import History
+from import_worker import ImportJob
+from folder_watch import FolderWatcher, iter_audio_files
+from loudness import LoudnessJob
+
+DRAG_INTERVAL_MS = 16  # handle drag motion at most once per display frame
+WATCH_POLL_MS = 500
+# What to do with imported files whose audio matches a track already listed
+DUPLICATE_MODES = ("flag", "skip", "ignore")
+PREVIEW_TAGS = ("fit_keep", "fit_drop", "disc_even", "disc_odd")  # row tints of a fit preview
 
 
 class TrackList(ttk.Frame):
     """Reorderable track list with drop zone, treeview, and remove button."""
 
-    def __init__(self, parent, on_change=None, on_play_track=None):
+    def __init__(self, parent, on_change=None, on_play_track=None,
+                 project: AlbumProject | None = None, on_field_change=None):
         super().__init__(parent)
-        self.tracks: list[Track] = []
+        self.project = project if project is not None else AlbumProject()
         self.on_change = on_change  # callback when tracks change
-        self.on_play_track = on_play_track  # callback when play icon clicked
+        self.on_play_track = on_play_track  # callback(track, row) when play icon clicked
+        self.on_field_change = on_field_change  # callback(name, value) on field undo/redo
+        self.history = History()
         self._playing_track: Track | None = None
+        self._iids: list[str] = []  # tree row ids, parallel to self.tracks
+        self._row_tracks: dict[str, Track] = {}
+        self._playing_iids: list[str] = []
+        self._next_iid = 0
         self._drag_source = None
+        self._drag_y = 0
+        self._drag_after = None
+        self._change_pending = False
+        self._import_job: ImportJob | None = None
+        self._pending_paths: list[str] = []
+        self._pending_folders: list[str] = []
+        self._rescan_job: ImportJob | None = None
+        self._refresh_jobs: list[ImportJob] = []
+        self._watcher: FolderWatcher | None = None
+        self._loudness_job: LoudnessJob | None = None
+        self.analyze_loudness = False  # measure LUFS / true peak of every track
+        self._preview_iids: list[str] = []  # rows tinted by a disc-fit preview
+        self.exact_durations = False  # count every frame instead of estimating
+        self.duplicates = "flag"  # one of DUPLICATE_MODES
+        self._audio_hashes: dict[str, str] = {}  # source path -> audio hash
+        self._dupes_flagged = 0  # duplicates of the running import already highlighted
+        self._offsets_pending = False
         self._build_ui()
 
+    @property
+    def tracks(self) -> list[Track]:
+        return self.project.tracks
+
+    @tracks.setter
+    def tracks(self, tracks: list[Track]):
+        self.project.set_tracks(tracks)
+
+    def set_project(self, project: AlbumProject, history: History | None = None):
+        """Show a different project, rebuilding all rows. ``history`` is the
+        project's undo history, if it was shown before.
+
+        Imports still running are cancelled, so their tracks don't land in
+        the new project; an exact-duration rescan and loudness analysis
+        carry on with the new project's tracks.
+        """
+        rescanning = self._rescan_job is not None
+        self.cancel_import()
+        if self._import_job:
+            self._import_job = None
+            self.progress_frame.pack_forget()
+        if self._rescan_job:
+            self._rescan_job.cancel()
+            self._rescan_job = None
+        if self._loudness_job:
+            self._loudness_job.cancel()
+            self._loudness_job = None
+        self.project = project
+        self.history = history if history is not None else History()
+        self._refresh()
+        if rescanning:
+            self.set_exact_durations(self.exact_durations)
+        if self.analyze_loudness:
+            self.start_loudness_analysis()
+
     def _build_ui(self):
         # Drop zone
         self.drop_frame = tk.Frame(self, bg=COLORS["bg_surface"], cursor="hand2",
@@ -25,39 +96,64 @@ class TrackList(ttk.Frame):
                                     highlightthickness=2, height=60)
         self.drop_frame.pack(fill="x", padx=5, pady=(5, 5))
         self.drop_frame.pack_propagate(False)
-        self.drop_label = tk.Label(self.drop_frame, text="Drag MP3s here or click to add",
+        self.drop_label = tk.Label(self.drop_frame, text="Drag audio files here or click to add",
                                     bg=COLORS["bg_surface"], fg=COLORS["text_dim"],
                                     font=("Segoe UI", 10))
         self.drop_label.pack(expand=True)
         self.drop_frame.bind("<Button-1>", self._on_click_add)
         self.drop_label.bind("<Button-1>", self._on_click_add)
 
+        # Import progress (shown while a background import runs)
+        self.progress_frame = ttk.Frame(self)
+        self.progress_label = ttk.Label(self.progress_frame, text="", style="Dim.TLabel")
+        self.progress_label.pack(side="left", padx=(0, 8))
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate")
+        self.progress_bar.pack(side="left", fill="x", expand=True)
+        self.cancel_btn = ttk.Button(self.progress_frame, text="Cancel",
+                                     command=self.cancel_import)
+        self.cancel_btn.pack(side="left", padx=(8, 0))
+
         # Treeview
-        columns = ("play", "num", "title", "duration", "filename", "remove")
+        columns = ("play", "num", "title", "duration", "start", "lufs", "peak",
+                   "filename", "remove")
         self.tree = ttk.Treeview(self, columns=columns, show="headings", selectmode="extended")
         self.tree.heading("play", text="")
         self.tree.heading("num", text="#")
         self.tree.heading("title", text="Title")
         self.tree.heading("duration", text="Duration")
+        self.tree.heading("start", text="Start")
+        self.tree.heading("lufs", text="LUFS")
+        self.tree.heading("peak", text="Peak")
         self.tree.heading("filename", text="Original File")
         self.tree.heading("remove", text="")
         self.tree.column("play", width=30, minwidth=30, stretch=False)
         self.tree.column("num", width=40, minwidth=40, stretch=False)
         self.tree.column("title", width=200, minwidth=100)
         self.tree.column("duration", width=70, minwidth=60, stretch=False)
+        self.tree.column("start", width=60, minwidth=50, stretch=False)
+        self.tree.column("lufs", width=55, minwidth=45, stretch=False)
+        self.tree.column("peak", width=55, minwidth=45, stretch=False)
         self.tree.column("filename", width=150, minwidth=80)
         self.tree.column("remove", width=30, minwidth=30, stretch=False)
 
         scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self._scrollbar = scrollbar
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
         self.tree.pack(side="left", fill="both", expand=True, padx=(5, 0), pady=5)
         scrollbar.pack(side="left", fill="y", pady=5)
 
         # Empty state
-        self.empty_label = tk.Label(self, text="Drop MP3 files to begin",
+        self.empty_label = tk.Label(self, text="Drop MP3, WAV or FLAC files to begin",
                                      bg=COLORS["bg"], fg=COLORS["text_dim"],
                                      font=("Segoe UI", 11))
 
+        # Disc-fit preview tints
+        self.tree.tag_configure("fit_keep", background=COLORS["bg_surface"])
+        self.tree.tag_configure("fit_drop", foreground=COLORS["text_dim"])
+        self.tree.tag_configure("disc_even", background=COLORS["bg_light"])
+        self.tree.tag_configure("disc_odd", background=COLORS["bg_surface"])
+        self.tree.tag_configure("duplicate", foreground=COLORS["yellow"])
+
         # Drag reorder bindings
         self.tree.bind("<ButtonPress-1>", self._on_press)
         self.tree.bind("<B1-Motion>", self._on_drag)
@@ -69,37 +165,302 @@ class TrackList(ttk.Frame):
 
     def _on_click_add(self, event=None):
         files = filedialog.askopenfilenames(
-            title="Select MP3 files",
-            filetypes=[("MP3 files", "*.mp3"), ("All files", "*.*")]
+            title="Select audio files",
+            filetypes=[("Audio files", " ".join("*" + ext for ext in formats.supported_extensions())),
+                       ("All files", "*.*")]
         )
         if files:
             self.add_files(files)
 
     def add_files(self, paths):
-        """Add MP3 files from a list of paths."""
+        """Add audio files from a list of paths, reading metadata in the background."""
+        paths = list(paths)
+        if not paths:
+            return
+        if self._import_job:
+            self._pending_paths.extend(paths)
+            return
+        self._start_import(paths)
+
+    def add_folder(self, root: str):
+        """Import every audio file under ``root``, streaming the directory walk."""
+        if self._import_job:
+            self._pending_folders.append(root)
+            return
+        self._start_import(iter_audio_files(root))
+
+    def _start_import(self, paths):
+        if self.duplicates == "ignore":
+            self._import_job = ImportJob(paths, exact=self.exact_durations)
+        else:
+            existing = {t.source_path: self._audio_hashes.get(t.source_path)
+                        for t in self.tracks}
+            self._import_job = ImportJob(paths, exact=self.exact_durations,
+                                         duplicates=self.duplicates, existing=existing)
+        self._dupes_flagged = 0
+        self._import_job.start()
+        self.progress_bar.configure(maximum=max(self._import_job.total, 1), value=0)
+        self.progress_frame.pack(fill="x", padx=5, pady=(0, 5), after=self.drop_frame)
+        self._poll_import(self._import_job)
+
+    def _flag_duplicates(self, job: ImportJob):
+        """Highlight the rows ``job`` found to repeat earlier audio since the
+        last poll (a match with an existing track can come after the row)."""
+        rows = {id(t): i for i, t in enumerate(self.tracks)}
+        for t, _ in job.duplicates_found[self._dupes_flagged:]:
+            i = rows.get(id(t))
+            if i is not None:
+                self._add_tag(self._iids[i], "duplicate")
+        self._dupes_flagged = len(job.duplicates_found)
+
+    def cancel_import(self):
+        self._pending_paths.clear()
+        self._pending_folders.clear()
+        if self._import_job:
+            self._import_job.cancel()
+
+    def _poll_import(self, job: ImportJob):
+        if job is not self._import_job:
+            return  # cancelled when another project was shown
+        new_tracks = job.poll()
+        if new_tracks:
+            start = len(self.tracks)
+            self._insert_rows(start, new_tracks, merge=job)
+            self._notify_change()
+        if job.duplicates == "flag" and len(job.duplicates_found) > self._dupes_flagged:
+            self._flag_duplicates(job)
+        self.progress_bar.configure(maximum=max(job.total, 1), value=job.completed)
+        self.progress_label.configure(text=f"Importing {job.completed}/{job.total}")
+        if not job.done:
+            self.after(50, self._poll_import, job)
+            return
+
+        self._import_job = None
+        self.progress_frame.pack_forget()
+        self._audio_hashes.update(job.hashes)
+        if self.analyze_loudness:
+            self.start_loudness_analysis()
+        if job.errors:
+            messagebox.showwarning(
+                "Import problems",
+                f"{len(job.errors)} file(s) could not be added:\n{job.error_report()}",
+                parent=self,
+            )
+        if job.duplicates_found:
+            action = "skipped" if job.duplicates == "skip" else "added and highlighted"
+            messagebox.showinfo(
+                "Duplicate audio",
+                f"{len(job.duplicates_found)} file(s) repeat audio already in the list "
+                f"and were {action}:\n{job.duplicate_report()}",
+                parent=self,
+            )
+        if self._pending_paths:
+            paths, self._pending_paths = self._pending_paths, []
+            self.add_files(paths)
+        elif self._pending_folders:
+            self.add_folder(self._pending_folders.pop(0))
+
+    def watch_folder(self, root: str):
+        """Import ``root`` and keep adding audio files that appear under it later.
+
+        Files already in the list that are rewritten get their title and
+        duration re-read instead of being added again.
+        """
+        self.stop_watching()
+        # Watch first so nothing written during the initial import is missed
+        self._watcher = FolderWatcher(root)
+        self._watcher.start()
+        self.add_folder(root)
+        self._poll_watcher(self._watcher)
+
+    def stop_watching(self):
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None
+
+    def _poll_watcher(self, watcher: FolderWatcher):
+        if watcher is not self._watcher:
+            return
+        # Hold reports until imports settle, so nothing is added twice
+        if not self._import_job:
+            paths = watcher.poll()
+            if paths:
+                known = {t.source_path for t in self.tracks}
+                resolved = [os.path.realpath(p) for p in paths]
+                changed = [p for p in resolved if p in known]
+                added = [p for p in resolved if p not in known]
+                if changed:
+                    self.refresh_files(changed)
+                if added:
+                    self.add_files(added)
+        self.after(WATCH_POLL_MS, self._poll_watcher, watcher)
+
+    def refresh_files(self, paths):
+        """Re-read title and duration for tracks whose files changed."""
         for p in paths:
-            p = p.strip().strip("{}")
-            if not p.lower().endswith(".mp3"):
-                messagebox.showwarning("Invalid file", f"Not an MP3:\n{Path(p).name}")
-                continue
-            if not Path(p).exists():
-                messagebox.showwarning("Missing file", f"File not found:\n{p}")
+            self._audio_hashes.pop(os.path.realpath(p), None)
+        job = ImportJob(paths, exact=self.exact_durations)
+        self._refresh_jobs.append(job)
+        job.start()
+        self._poll_refresh(job)
+
+    def refresh_durations(self, tracks: list[Track]):
+        """Re-read the durations of ``tracks`` in the background, e.g. files
+        that changed since a project was saved. Tracks of other album
+        versions are updated too; titles are kept."""
+        if not tracks:
+            return
+        job = ImportJob([t.source_path for t in tracks], exact=self.exact_durations)
+        self._refresh_jobs.append(job)
+        job.start()
+        self._poll_refresh(job, titles=False, others={t.source_path: t for t in tracks})
+
+    def _poll_refresh(self, job: ImportJob, titles: bool = True, others=None):
+        if job not in self._refresh_jobs:
+            return
+        fresh = job.poll(limit=1000)
+        if others:
+            for t in fresh:  # shared Track objects of versions not shown
+                if t.source_path in others:
+                    others[t.source_path].duration_secs = t.duration_secs
+        self._apply_refreshed(fresh, titles=titles)
+        if job.done:
+            self._refresh_jobs.remove(job)
+            if titles and self.analyze_loudness:
+                self.start_loudness_analysis()
+        else:
+            self.after(100, self._poll_refresh, job, titles, others)
+
+    def _apply_refreshed(self, tracks: list[Track], titles: bool = False):
+        by_path = {t.source_path: t for t in tracks}
+        if not by_path:
+            return
+        for i, t in enumerate(self.tracks):
+            fresh = by_path.get(t.source_path)
+            if fresh is None:
                 continue
-            try:
-                track = Track.from_file(p)
-                self.tracks.append(track)
-            except Exception as e:
-                messagebox.showerror("Error", f"Could not read:\n{Path(p).name}\n{e}")
-        self._refresh()
+            self.project.set_duration(i, fresh.duration_secs)
+            self.tree.set(self._iids[i], "duration", self._format_duration(t))
+            if titles:
+                t.title = fresh.title
+                t.file_size = fresh.file_size
+                t.lufs = t.true_peak_db = None  # the file changed; measure again
+                self.tree.set(self._iids[i], "title", t.title)
+                self.tree.set(self._iids[i], "lufs", "")
+                self.tree.set(self._iids[i], "peak", "")
+        self._notify_change()
+
+    def set_loudness_analysis(self, enabled: bool):
+        """Turn loudness columns on or off, analysing tracks in the background."""
+        self.analyze_loudness = enabled
+        if enabled:
+            self.start_loudness_analysis()
+        elif self._loudness_job:
+            self._loudness_job.cancel()
+            self._loudness_job = None
+
+    def start_loudness_analysis(self):
+        """Analyse tracks without a loudness value (cached results return at once)."""
+        if self._loudness_job and not self._loudness_job.done:
+            self._loudness_job.cancel()
+        paths = [t.source_path for t in self.tracks if t.lufs is None]
+        if not paths:
+            return
+        self._loudness_job = LoudnessJob(paths)
+        self._loudness_job.start()
+        self._poll_loudness(self._loudness_job)
+
+    def _poll_loudness(self, job: LoudnessJob):
+        if job is not self._loudness_job:
+            return
+        results = dict(job.poll(limit=1000))
+        if results:
+            for i, t in enumerate(self.tracks):
+                fields = results.get(t.source_path)
+                if fields is None:
+                    continue
+                t.lufs = fields["lufs"]
+                t.true_peak_db = fields["true_peak_db"]
+                self.tree.set(self._iids[i], "lufs", self._format_lufs(t))
+                self.tree.set(self._iids[i], "peak", self._format_peak(t))
+        if not job.done:
+            self.after(200, self._poll_loudness, job)
+            return
+        self._loudness_job = None
+        if job.errors:
+            messagebox.showwarning(
+                "Loudness problems",
+                f"{len(job.errors)} file(s) could not be analysed:\n{job.error_report()}",
+                parent=self,
+            )
+
+    def set_exact_durations(self, enabled: bool):
+        """Switch duration mode and re-measure the current tracks in the background."""
+        self.exact_durations = enabled
+        if self._rescan_job:
+            self._rescan_job.cancel()
+            self._rescan_job = None
+        if not self.tracks:
+            return
+        self._rescan_job = ImportJob([t.source_path for t in self.tracks], exact=enabled)
+        self._rescan_job.start()
+        self._poll_rescan(self._rescan_job)
+
+    def _poll_rescan(self, job: ImportJob):
+        if job is not self._rescan_job:
+            return
+        self._apply_refreshed(job.poll(limit=1000))
+        if job.done:
+            self._rescan_job = None
+        else:
+            self.after(100, self._poll_rescan, job)
 
     def remove_selected(self):
         sel = self.tree.selection()
         if not sel:
             return
-        indices = sorted([self.tree.index(s) for s in sel], reverse=True)
-        for i in indices:
-            self.tracks.pop(i)
-        self._refresh()
+        self._delete_rows([self._iids.index(s) for s in sel])
+        self._notify_change()
+
+    def remove_tracks(self, indices):
+        self._delete_rows(list(indices))
+        self._notify_change()
+
+    def show_fit_preview(self, groups: list[list[int]]):
+        """Tint rows by disc-fit suggestion.
+
+        A single group is a suggested subset (other rows are dimmed);
+        several groups are consecutive discs, shaded alternately.
+        """
+        self.clear_fit_preview()
+        if len(groups) == 1:
+            keep = set(groups[0])
+            for i, iid in enumerate(self._iids):
+                self._add_tag(iid, "fit_keep" if i in keep else "fit_drop")
+        else:
+            for n, group in enumerate(groups):
+                for i in group:
+                    self._add_tag(self._iids[i], "disc_odd" if n % 2 else "disc_even")
+        self._preview_iids = list(self._iids)
+
+    def clear_fit_preview(self):
+        for iid in self._preview_iids:
+            if iid in self._row_tracks:
+                tags = self.tree.item(iid, "tags")
+                kept = tuple(t for t in tags if t not in PREVIEW_TAGS)
+                if len(kept) != len(tags):
+                    self.tree.item(iid, tags=kept)
+        self._preview_iids = []
+
+    def _add_tag(self, iid: str, tag: str):
+        """Add ``tag`` to a row, keeping the tags it already has."""
+        tags = self.tree.item(iid, "tags")
+        if tag not in tags:
+            self.tree.item(iid, tags=tuple(tags) + (tag,))
 
     def _on_tree_click(self, event):
         region = self.tree.identify_region(event.x, event.y)
@@ -107,15 +468,15 @@ class TrackList(ttk.Frame):
         item = self.tree.identify_row(event.y)
         if not item or region != "cell":
             return
-        idx = self.tree.index(item)
         if col == "#1":  # play column
-            if self.on_play_track and idx < len(self.tracks):
-                self.on_play_track(self.tracks[idx])
-        elif col == "#6":  # remove column
-            self.tracks.pop(idx)
-            self._refresh()
+            if self.on_play_track:
+                self.on_play_track(self._row_tracks[item], self._iids.index(item))
+        elif col == "#9":  # remove column
+            self._delete_rows([self._iids.index(item)])
+            self._notify_change()
 
     # --- Drag reorder ---
+    # While dragging only the tree row moves; the model is reordered once on release.
     def _on_press(self, event):
         item = self.tree.identify_row(event.y)
         if item:
@@ -124,51 +485,212 @@ class TrackList(ttk.Frame):
     def _on_drag(self, event):
         if not self._drag_source:
             return
-        target = self.tree.identify_row(event.y)
+        self._drag_y = event.y
+        if self._drag_after is None:
+            self._drag_after = self.after(DRAG_INTERVAL_MS, self._process_drag)
+
+    def _process_drag(self):
+        self._drag_after = None
+        if not self._drag_source:
+            return
+        target = self.tree.identify_row(self._drag_y)
         if target and target != self._drag_source:
-            src_idx = self.tree.index(self._drag_source)
-            dst_idx = self.tree.index(target)
-            track = self.tracks.pop(src_idx)
-            self.tracks.insert(dst_idx, track)
-            self._refresh()
-            # re-find the moved item
-            children = self.tree.get_children()
-            if dst_idx < len(children):
-                self._drag_source = children[dst_idx]
+            self.tree.move(self._drag_source, "", self.tree.index(target))
 
     def _on_release(self, event):
-        self._drag_source = None
+        if self._drag_after is not None:
+            self.after_cancel(self._drag_after)
+            self._process_drag()
+        source, self._drag_source = self._drag_source, None
+        if source not in self._row_tracks:
+            return
+        src = self._iids.index(source)
+        dst = self.tree.index(source)
+        if src != dst:
+            self._move_row(src, dst)
+            self._notify_change()
+
+    # --- Undo ---
+    def undo(self) -> bool:
+        """Revert the last change to the running order or album fields."""
+        return self._apply_history(self.history.undo())
+
+    def redo(self) -> bool:
+        return self._apply_history(self.history.redo())
+
+    def _apply_history(self, ops: list[tuple]) -> bool:
+        if not ops or self._drag_source:
+            return False
+        self.history.paused = True
+        try:
+            for op in ops:
+                kind = op[0]
+                if kind == "insert":
+                    self._insert_rows(op[1], list(op[2]))
+                elif kind == "remove":
+                    self._delete_rows(op[1])
+                elif kind == "reinsert":
+                    self._reinsert_rows(op[1], op[2])
+                elif kind == "move":
+                    self._move_row(op[1], op[2])
+                elif kind == "field" and self.on_field_change:
+                    self.on_field_change(op[1], op[3])
+        finally:
+            self.history.paused = False
+        self._notify_change()
+        return True
+
+    def _reinsert_rows(self, indices: tuple, tracks: tuple):
+        """Put tracks back at their (ascending) indices, one run at a time."""
+        start = 0
+        for end in range(1, len(indices) + 1):
+            if end == len(indices) or indices[end] != indices[end - 1] + 1:
+                self._insert_rows(indices[start], list(tracks[start:end]))
+                start = end
 
     # --- Display ---
+    @tracing.traced("TrackList._refresh", "ui")
     def _refresh(self):
-        self.tree.delete(*self.tree.get_children())
-        for i, t in enumerate(self.tracks, 1):
-            mins, secs = divmod(int(t.duration_secs), 60)
-            icon = "\u23f8" if (self._playing_track and t.source_path == self._playing_track.source_path) else "\u25b6"
-            self.tree.insert("", "end", values=(
-                icon,
-                f"{i:02d}",
+        """Rebuild every row from self.tracks (used when the list is replaced)."""
+        self.tree.delete(*self._iids)
+        self._iids = []
+        self._row_tracks = {}
+        self._playing_iids = []
+        self.project.set_tracks(self.project.tracks)
+        self._add_tree_rows(0, self.tracks)
+        self._notify_change()
+
+    def _notify_change(self):
+        """Schedule one on_change callback for all changes made before idle."""
+        if not self._change_pending:
+            self._change_pending = True
+            self.after_idle(self._flush_change)
+
+    def _flush_change(self):
+        self._change_pending = False
+        self.clear_fit_preview()  # suggestions are stale once the list changes
+        self._update_empty_state()
+        self._update_visible_offsets()
+        if self.on_change:
+            self.on_change()
+
+    @staticmethod
+    def _format_duration(track: Track) -> str:
+        mins, secs = divmod(int(track.duration_secs), 60)
+        return f"{mins}:{secs:02d}"
+
+    @staticmethod
+    def _format_lufs(track: Track) -> str:
+        return f"{track.lufs:.1f}" if track.lufs is not None else ""
+
+    @staticmethod
+    def _format_peak(track: Track) -> str:
+        return f"{track.true_peak_db:+.1f}" if track.true_peak_db is not None else ""
+
+    def _is_playing(self, track: Track) -> bool:
+        return bool(self._playing_track and track.source_path == self._playing_track.source_path)
+
+    def _insert_rows(self, index: int, tracks: list[Track], merge=None):
+        """Insert tracks into the model and tree at index, renumbering what follows.
+
+        ``merge`` joins this insert to the previous undo entry with the same key.
+        """
+        self.history.record(("insert", index, tuple(tracks)), merge)
+        self.project.insert(index, tracks)
+        self._add_tree_rows(index, tracks)
+        self._renumber(index + len(tracks), len(self.tracks))
+
+    def _add_tree_rows(self, index: int, tracks: list[Track]):
+        new_iids = []
+        for offset, t in enumerate(tracks):
+            iid = f"t{self._next_iid}"
+            self._next_iid += 1
+            playing = self._is_playing(t)
+            self.tree.insert("", index + offset, iid=iid, values=(
+                "\u23f8" if playing else "\u25b6",
+                f"{index + offset + 1:02d}",
                 t.title,
-                f"{mins}:{secs:02d}",
+                self._format_duration(t),
+                "",  # start offset, filled in for visible rows
+                self._format_lufs(t),
+                self._format_peak(t),
                 t.original_filename,
                 "\u2715"
             ))
-        self._update_empty_state()
-        if self.on_change:
-            self.on_change()
+            self._row_tracks[iid] = t
+            if playing:
+                self._playing_iids.append(iid)
+            new_iids.append(iid)
+        self._iids[index:index] = new_iids
+
+    def _delete_rows(self, indices):
+        """Remove the rows at the given model indices."""
+        if not indices:
+            return
+        indices = sorted(set(indices), reverse=True)
+        doomed = [self._iids[i] for i in indices]
+        self.tree.delete(*doomed)
+        removed = self.project.remove(indices)
+        self.history.record(("remove", tuple(indices[::-1]), tuple(removed)))
+        for i in indices:
+            del self._iids[i]
+        for iid in doomed:
+            del self._row_tracks[iid]
+            if iid in self._playing_iids:
+                self._playing_iids.remove(iid)
+        self._renumber(indices[-1], len(self.tracks))
+
+    def _move_row(self, src: int, dst: int):
+        """Move one row from src to dst, renumbering only the rows in between."""
+        if src == dst:
+            return
+        self.history.record(("move", src, dst))
+        self.project.move(src, dst)
+        self._iids.insert(dst, self._iids.pop(src))
+        iid = self._iids[dst]
+        self.tree.move(iid, "", dst)
+        self._renumber(min(src, dst), max(src, dst) + 1)
+
+    def _on_tree_scroll(self, first, last):
+        self._scrollbar.set(first, last)
+        if not self._offsets_pending:
+            self._offsets_pending = True
+            self.after_idle(self._update_visible_offsets)
+
+    def _update_visible_offsets(self):
+        """Fill the Start column for the rows currently in view.
+
+        Offsets come from the project's prefix sums, so only the visible rows
+        are touched no matter how long the list is.
+        """
+        self._offsets_pending = False
+        n = len(self._iids)
+        if not n:
+            return
+        first, last = self.tree.yview()
+        lo = max(0, int(first * n) - 1)
+        hi = min(n, int(last * n) + 2)
+        for i in range(lo, hi):
+            mins, secs = divmod(int(self.project.start_offset(i)), 60)
+            self.tree.set(self._iids[i], "start", f"{mins}:{secs:02d}")
+
+    def _renumber(self, start: int, end: int):
+        for i in range(start, end):
+            self.tree.set(self._iids[i], "num", f"{i + 1:02d}")
 
     def update_playing_indicator(self, track: "Track | None"):
         """Update which row shows the pause icon vs play icon."""
         self._playing_track = track
-        # Update icons in-place without full refresh to avoid disrupting selection
-        for child in self.tree.get_children():
-            values = list(self.tree.item(child, "values"))
-            idx = self.tree.index(child)
-            if idx < len(self.tracks):
-                t = self.tracks[idx]
-                icon = "\u23f8" if (track and t.source_path == track.source_path) else "\u25b6"
-                values[0] = icon
-                self.tree.item(child, values=values)
+        # Only touch the rows whose icon actually changes
+        for iid in self._playing_iids:
+            if iid in self._row_tracks:
+                self.tree.set(iid, "play", "\u25b6")
+        self._playing_iids = []
+        if track:
+            self._playing_iids = [iid for iid, t in self._row_tracks.items()
+                                  if t.source_path == track.source_path]
+            for iid in self._playing_iids:
+                self.tree.set(iid, "play", "\u23f8")
 
     def _update_empty_state(self):
         if not self.tracks:
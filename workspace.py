@@ -0,0 +1,118 @@
+"""Album versions (running orders, clean/explicit, vinyl sides) sharing one
+store of tracks.
+
+Each version is an AlbumProject whose track list references the store's
+Track objects, so a version costs a pointer and a duration per entry and
+memory grows with the number of distinct files, not versions x tracks.
+"""
+from models import AlbumProject, Track
+
+DEFAULT_VERSION = "Main"
+
+
+class TrackStore:
+    """One Track per source file, shared by every version that uses it."""
+
+    def __init__(self):
+        self._by_path: dict[str, Track] = {}
+
+    def add(self, track: Track) -> Track:
+        """The stored Track for ``track``'s file, storing ``track`` if new."""
+        return self._by_path.setdefault(track.source_path, track)
+
+    def get(self, path: str) -> Track | None:
+        return self._by_path.get(path)
+
+    def __len__(self) -> int:
+        return len(self._by_path)
+
+    def __iter__(self):
+        return iter(self._by_path.values())
+
+
+class Workspace:
+    """Named album versions, one of them active."""
+
+    def __init__(self):
+        self.store = TrackStore()
+        self.versions: dict[str, AlbumProject] = {}
+        self.active = ""
+
+    @classmethod
+    def single(cls, project: AlbumProject, name: str = DEFAULT_VERSION) -> "Workspace":
+        ws = cls()
+        ws.add_version(name, project)
+        return ws
+
+    @property
+    def project(self) -> AlbumProject:
+        return self.versions[self.active]
+
+    def names(self) -> list[str]:
+        return list(self.versions)
+
+    def share(self, project: AlbumProject):
+        """Point ``project`` at the store's Track objects, adding new ones."""
+        project.set_tracks([self.store.add(t) for t in project.tracks])
+
+    def add_version(self, name: str, project: AlbumProject | None = None,
+                    copy_of: str | None = None) -> AlbumProject:
+        """Add ``project`` as version ``name``, or a copy of version
+        ``copy_of`` (default: the active one) if no project is given."""
+        if name in self.versions:
+            raise ValueError(f"There is already a version called {name!r}")
+        if not name.strip():
+            raise ValueError("Version names can't be empty")
+        if project is None:
+            source = self.versions[copy_of or self.active]
+            project = AlbumProject(band_name=source.band_name, album_name=source.album_name,
+                                   tracks=list(source.tracks))
+        else:
+            self.share(project)
+        self.versions[name] = project
+        if not self.active:
+            self.active = name
+        return project
+
+    def rename_version(self, old: str, new: str):
+        if new == old:
+            return
+        if new in self.versions:
+            raise ValueError(f"There is already a version called {new!r}")
+        if not new.strip():
+            raise ValueError("Version names can't be empty")
+        # rebuild to keep the versions in their original order
+        self.versions = {new if name == old else name: p for name, p in self.versions.items()}
+        if self.active == old:
+            self.active = new
+
+    def remove_version(self, name: str):
+        if len(self.versions) == 1:
+            raise ValueError("A workspace needs at least one version")
+        names = self.names()
+        del self.versions[name]
+        if self.active == name:
+            i = names.index(name)
+            self.active = names[i - 1] if i else names[1]
+
+    def switch(self, name: str) -> AlbumProject:
+        """Make ``name`` the active version and return it."""
+        project = self.versions[name]
+        self.active = name
+        # tracks added elsewhere since, and durations refreshed through other versions
+        self.share(project)
+        return project
+
+    def library(self) -> list[Track]:
+        """Every track used by some version, once each, in first-use order."""
+        seen: dict[str, Track] = {}
+        for project in self.versions.values():
+            for t in project.tracks:
+                seen.setdefault(t.source_path, t)
+        return list(seen.values())
+
+    def refresh(self):
+        """Re-share every version, e.g. after tracks were relinked in place."""
+        self.store = TrackStore()
+        for project in self.versions.values():
+            self.share(project)